@@ -1,10 +1,19 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Cookie, FastAPI, HTTPException, Query
 import pandas as pd
-import numpy as np
 import logging
-import requests
-import uvicorn
 import asyncio
+import base64
+import bisect
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from shared import json_response, render_pool, schema, upstream, worker_mode
+from shared.health import add_health_routes
+from shared.job_store import JobStore, job_key
+from shared.json_response import FastJSONResponse
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
@@ -12,69 +21,166 @@ app = FastAPI(title="Importer Data API", description="API for filtering and sear
 
 
 INPUT_FILE = "output.xlsx"  
-FILTERED_FILE = "filtered_data.xlsx"  
+SNAPSHOT_FILE = "jobs_auth.arrow"  # one snapshot (and leader lock) per service
 DATE_COLUMN = "job_date"  
+SESSION_COOKIE = "filter_session"
+SESSION_TTL = 3600  # seconds
+MAX_SESSIONS = 10000
+MAX_PAGE_SIZE = 1000
+SEARCH_LIMIT = 50  # matches returned by /search unless the caller asks for more
 
-try:
-    df = pd.read_excel(INPUT_FILE, sheet_name="Sheet1", dtype={'job_no': str})
-    df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], errors='coerce')
-except Exception as e:
-    logger.error(f"Error loading file {INPUT_FILE}: {e}")
-    df = None  # Handle missing file scenario
 
+def importer_key(name):
+    """Normalize an importer name for partition lookups."""
+    return str(name).strip().lower()
 
-def json_to_excel(json_data, output_file=INPUT_FILE):
-    columns = [
-        'job_no', 'job_date', 'year', 'priorityJob', 'custom_house', 'importer',
-        'supplier_exporter', 'invoice_number', 'invoice_date', 'assbl_value', 'awb_bl_no',
-        'awb_bl_date', 'cif_amount', 'no_of_container', 'container_nos', 'cth_documents',
-        'description', 'type_of_b_e', 'gross_weight', 'loading_port', 'origin_country',
-        'port_of_reporting', 'shipping_line_airline', 'consignment_type', 'do_copies',
-        'cth_no', 'total_duty', 'voyage_no', 'detailed_status', 'vessel_berthing',
-        'vessel_flight', 'assessment_date', 'be_date', 'be_no', 'completed_operation_date',
-        'inv_currency', 'job_owner', 'total_inv_value', 'status', 'shipping_line_attachment',
-        'shipping_line_insurance', 'shipping_line_invoice_imgs', 'submissionQueries',
-        'unit_1', 'utr', 'verified_checklist_upload', '__v', 'bill_document_sent_to_accounts',
-        'containers_arrived_on_same_date', 'delivery_date', 'discharge_date', 'doPlanning',
-        'do_completed', 'do_planning_date', 'do_revalidation', 'do_revalidation_date',
-        'do_revalidation_upto_job_level', 'document_received_date', 'documentation_completed_date_time',
-        'duty_paid_date', 'esanchit_completed_date_time', 'examinationPlanning', 'examination_planning_date',
-        'free_time', 'gateway_igm_date', 'nfmims_date', 'nfmims_reg_no', 'obl_telex_bl',
-        'out_of_charge', 'pims_date', 'pims_reg_no', 'remarks', 'sims_date', 'sims_reg_no',
-        'submission_completed_date_time', 'type_of_Do', 'bill_date', 'bill_no', 'gateway_igm',
-        'hss_name', 'igm_date', 'igm_no', 'no_of_pkgs', 'toi', 'unit', 'unit_price',
-        'rail_out_date', 'do_validity_upto_job_level', 'do_processed', 'do_processed_date',
-        'do_validity', 'other_invoices', 'other_invoices_date', 'payment_made', 'payment_made_date',
-        'security_deposit', 'shipping_line_invoice', 'shipping_line_invoice_date', 'concor_gate_pass_date',
-        'concor_gate_pass_validate_up_to', 'examination_date', 'pcv_date', 'fta_Benefit_date_time',
-        'createdAt', 'updatedAt', 'custodian_gate_pass', 'custom_house', 'do_copies', 'do_documents',
-        'do_queries', 'documentationQueries', 'documents', 'eSachitQueries', 'exrate',
-        'gate_pass_copies', 'gross_weight', 'icd_cfs_invoice_img', 'importer', 'importerURL',
-        'importer_address', 'inv_currency', 'is_free_time_updated', 'job_date', 'job_owner',
-        'job_sticker_upload', 'loading_port', 'no_of_container', 'ooc_copies', 'origin_country',
-        'other_invoices_img', 'port_of_reporting', 'processed_be_attachment'
+
+def sort_keys(df):
+    """Ascending sort key of each row for the newest-first ``/filter`` order.
+
+    Rows are ordered by ``job_date`` descending (missing dates last), then by
+    year and job number, so the order of any two jobs never depends on the
+    rest of the snapshot and a page cursor stays valid across refreshes.
+    """
+    dates = df[DATE_COLUMN].astype("datetime64[ns]")
+    missing = dates.isna().tolist()
+    stamps = dates.fillna(pd.Timestamp(0)).astype("int64").tolist()
+    years = df["year"].fillna("").astype(str).tolist()
+    job_nos = df["job_no"].fillna("").astype(str).tolist()
+    return [
+        (int(is_missing), 0 if is_missing else -stamp, year, job_no)
+        for is_missing, stamp, year, job_no in zip(missing, stamps, years, job_nos)
     ]
 
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the sort key encoded in ``cursor``; raises ``ValueError`` if malformed."""
+    try:
+        is_missing, stamp, year, job_no = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (int(is_missing), int(stamp), str(year), str(job_no))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class ImporterView:
+    """The jobs of one importer, newest first.
+
+    ``positions`` index rows of ``source``, the job frame in ``/filter``
+    order; ``records`` are the same jobs as their source records (for
+    field projection), ``bodies`` each record serialized to JSON bytes,
+    ``keys`` their sort keys for cursor pagination and ``index`` maps a
+    job key to the job's place in the view.
+    """
+
+    __slots__ = ("source", "positions", "records", "bodies", "keys", "index")
+
+    def __init__(self, source, positions, records, bodies, keys, index):
+        self.source = source
+        self.positions = positions
+        self.records = records
+        self.bodies = bodies
+        self.keys = keys
+        self.index = index
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def frame(self):
+        return self.source.iloc[self.positions]
+
+    def page(self, after=None, limit=None):
+        """Return the ``(start, end)`` slice following sort key ``after`` and the next page's cursor."""
+        start = 0 if after is None else bisect.bisect_right(self.keys, after)
+        end = len(self.records) if limit is None else min(start + limit, len(self.records))
+        next_cursor = encode_cursor(self.keys[end - 1]) if end < len(self.records) else None
+        return start, end, next_cursor
+
+
+def partition_by_importer(snapshot):
+    """Index the snapshot's jobs by normalized importer name, once per refresh.
+
+    The typed frame only orders and groups the jobs; the records served are
+    the frame's columns of the source records, with the values the API sent.
+    """
+    df = snapshot.frame
+    row_keys = sort_keys(df)
+    order = sorted(range(len(row_keys)), key=row_keys.__getitem__)
+    source = [snapshot.records[i] for i in order]
+    df = df.take(order).reset_index(drop=True)
+    row_keys = [row_keys[i] for i in order]
+    records = [{col: record.get(col) for col in df.columns} for record in source]
+    bodies = [json_response.dumps(record) for record in records]
+    job_keys = [snapshot.order[i] for i in order]
+    keys = df["importer"].astype("string").str.strip().str.lower()
+    return {
+        key: ImporterView(df, positions, [records[i] for i in positions], [bodies[i] for i in positions],
+                          [row_keys[i] for i in positions],
+                          {job_keys[i]: n for n, i in enumerate(positions)})
+        for key, positions in keys.groupby(keys, sort=False).indices.items()
+    }
+
+
+job_store = JobStore(frame_builder=schema.to_frame, partitioner=partition_by_importer,
+                     snapshot_path=SNAPSHOT_FILE)
+add_health_routes(app, job_store)
+
+# Importer filter of each /filter caller: token -> (importer key, expiry), oldest first.
+filter_sessions = OrderedDict()
+sessions_lock = threading.Lock()
+
+
+def open_filter_session(key, token=None):
+    """Remember ``key`` as the caller's filter; ``token`` is reused if it is still live."""
+    now = time.monotonic()
+    with sessions_lock:
+        if token not in filter_sessions:
+            token = secrets.token_urlsafe(16)
+        filter_sessions[token] = (key, now + SESSION_TTL)
+        filter_sessions.move_to_end(token)
+        while filter_sessions and (len(filter_sessions) > MAX_SESSIONS
+                                   or next(iter(filter_sessions.values()))[1] < now):
+            filter_sessions.popitem(last=False)
+    return token
+
+
+def session_importer(token):
+    """Return the importer key of a live filter session, or ``None``."""
+    if not token:
+        return None
+    with sessions_lock:
+        entry = filter_sessions.get(token)
+        if entry is None or entry[1] < time.monotonic():
+            filter_sessions.pop(token, None)
+            return None
+        return entry[0]
+
+
+def json_to_excel(json_data, output_file=INPUT_FILE):
     if isinstance(json_data, dict):
         json_data = [json_data]
 
-    df = pd.DataFrame(json_data)
-    existing_columns = [col for col in columns if col in df.columns]
-    df = df[existing_columns]
+    df = schema.select_columns(json_data)
     df.to_excel(output_file, index=False)
     print(f"Excel file '{output_file}' has been created successfully!")
 
 async def fetch_data():
     """Fetch API data and generate a report every 5 minutes."""
-    API_URL = "http://43.205.59.159:9000/api/download-report/24-25/Pending"
     while True:
         try:
-            response = requests.get(API_URL)
-            response.raise_for_status()
-            data = response.json()
-            output_file = json_to_excel(data)
-            logger.info(f"Excel report generated: {output_file}")
-        except requests.RequestException as e:
+            data = await upstream.fetch_json()
+            # Build off the event loop, then swap it in; in-flight requests keep the old snapshot.
+            snapshot = await asyncio.to_thread(job_store.build, data)
+            job_store.publish(snapshot)
+            if snapshot.has_changes:
+                await asyncio.to_thread(job_store.persist, snapshot)
+                output_file = await render_pool.render(json_to_excel, data)
+                logger.info(f"Excel report generated: {output_file}")
+        except Exception as e:
             logger.error(f"Failed to fetch data: {str(e)}")
         await asyncio.sleep(300)
 
@@ -86,49 +192,101 @@ def home():
 
 @app.on_event("startup")
 async def startup_event():
-    """Start background data fetching when FastAPI starts"""
-    background_task = asyncio.create_task(fetch_data())
+    """Load the last snapshot and start data fetching in the background when FastAPI starts"""
+    background_task = asyncio.create_task(worker_mode.run(job_store, fetch_data))
     print("Started background data fetch task")
 
 
-@app.get("/filter/{importer_name}")
-def filter_data(importer_name: str):
-    """Filters data based on Importer Name and returns JSON-compliant results."""
-    global df
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the pooled upstream connection"""
+    await upstream.close_client()
+    render_pool.shutdown()
+
+
+@app.get("/filter/{importer_name}", response_class=FastJSONResponse)
+def filter_data(importer_name: str,
+                limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                cursor: Optional[str] = None, fields: Optional[str] = None,
+                session: Optional[str] = Cookie(None, alias=SESSION_COOKIE)):
+    """Filters data based on Importer Name and returns JSON-compliant results.
 
-    if df is None:
-        raise HTTPException(status_code=500, detail="Excel file could not be loaded.")
+    Results are ordered newest ``job_date`` first. ``limit`` returns one page
+    of rows and ``next_cursor`` the ``cursor`` of the page after it; cursors
+    stay valid across data refreshes. ``fields`` is a comma-separated list of
+    the columns to return.
 
-    filtered_df = df[df["importer"].str.strip().str.lower() == importer_name.lower()]
-    filtered_df = filtered_df.sort_values(by=DATE_COLUMN, ascending=False)
-    filtered_df[DATE_COLUMN] = filtered_df[DATE_COLUMN].dt.strftime('%Y-%m-%d')
-    if filtered_df.empty:
+    The importer becomes the caller's filter context for ``/search``, keyed by
+    the returned ``token`` (also set as a cookie).
+    """
+    snapshot = job_store.current
+    if snapshot.frame is None:
+        raise HTTPException(status_code=503, detail="Job data is not loaded yet.")
+
+    key = importer_key(importer_name)
+    view = snapshot.partitions.get(key)
+    if view is None:
         raise HTTPException(status_code=404, detail=f"No records found for Importer: {importer_name}")
 
-    filtered_df = filtered_df.replace([np.nan, np.inf, -np.inf], None)
-    filtered_df.to_excel(FILTERED_FILE, index=False)
-    logger.info(f"Filtered {len(filtered_df)} records for Importer: {importer_name}")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    start, end, next_cursor = view.page(after, limit)
 
-    return {"message": "Filtered data retrieved", "data": filtered_df.to_dict(orient="records")}
+    if fields:
+        columns = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [col for col in columns if col not in snapshot.frame.columns]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        data = json_response.dumps([{col: record[col] for col in columns} for record in view.records[start:end]])
+    else:
+        # Full rows were serialized at refresh; only the page envelope is encoded here
+        data = json_response.array(view.bodies[start:end])
 
-@app.get("/search/{search_value}")
-def search_container(search_value: str):
-    """Searches filtered data for a specific job, container, invoice, or related values."""
+    token = open_filter_session(key, session)
+    logger.info(f"Filtered {end - start} of {len(view)} records for Importer: {importer_name}")
+
+    payload = {"message": "Filtered data retrieved", "token": token, "total": len(view), "next_cursor": next_cursor}
+    response = FastJSONResponse(json_response.envelope(payload, data=data))
+    response.set_cookie(SESSION_COOKIE, token, max_age=SESSION_TTL, httponly=True)
+    return response
+
+@app.get("/search/{search_value}", response_class=FastJSONResponse)
+def search_container(search_value: str, token: Optional[str] = None,
+                     limit: int = Query(SEARCH_LIMIT, ge=1, le=MAX_PAGE_SIZE),
+                     session: Optional[str] = Cookie(None, alias=SESSION_COOKIE)):
+    """Searches the caller's filtered data for a full or partial job, container, invoice, BE or CTH number.
+
+    The filter context comes from the ``token`` query parameter or the session
+    cookie set by ``/filter``; without one, all jobs are searched. ``data`` is
+    the best match and ``matches`` the best ``limit`` matches, best first;
+    ``total`` counts every match.
+    """
+    snapshot = job_store.current
+    if snapshot.frame is None:
+        raise HTTPException(status_code=503, detail="Job data is not loaded yet.")
     try:
-        df_filtered = pd.read_excel(FILTERED_FILE, dtype={'job_no': str})  # Read filtered data
-        search_columns = ['job_no', 'container_nos', 'invoice_number', 'be_no', 'cth_no']
-        available_columns = [col for col in search_columns if col in df_filtered.columns]
-        df_filtered[available_columns] = df_filtered[available_columns].astype(str)
-        query = df_filtered[available_columns].apply(lambda x: x.str.contains(str(search_value), na=False, case=False)).any(axis=1)
-
-        if query.any():
-            row_data = df_filtered[query].to_dict('records')[0]
-            row_data = {k: (None if isinstance(v, float) and (np.isnan(v) or np.isinf(v)) else v) for k, v in row_data.items()}
-            logger.info(f"Record found for {search_value}")
-            return {"message": "Record found", "data": row_data}
+        key = session_importer(token or session)
+        bodies, total = [], 0
+        for entry in snapshot.search(search_value):
+            importer = importer_key(entry.record.get("importer") or "")
+            view = snapshot.partitions.get(importer)
+            if view is None or (key is not None and importer != key):
+                continue
+            total += 1
+            if len(bodies) < limit:
+                bodies.append(view.bodies[view.index[job_key(entry.record)]])
+
+        if bodies:
+            logger.info(f"{total} records found for {search_value}")
+            payload = {"message": "Record found", "count": len(bodies), "total": total}
+            return FastJSONResponse(json_response.envelope(payload, data=bodies[0], matches=json_response.array(bodies)))
         else:
             raise HTTPException(status_code=404, detail=f"No record found for {search_value}")
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error searching for record: {str(e)}")
         raise HTTPException(status_code=500, detail="Error occurred while searching")
@@ -136,5 +294,5 @@ def search_container(search_value: str):
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8080)
+    worker_mode.serve(app, __file__, host="127.0.0.1", port=8080)
 
@@ -1,16 +1,28 @@
 import requests
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, NamedStyle
 from datetime import datetime
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+import argparse
 import json
 import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared import dates
+from shared.excel_export import StreamingReport
+from shared.job_store import count_containers, explode_containers
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+API_URL = "http://43.205.59.159:9000/api/24-25/jobs/Pending/all"
+MANIFEST_FILE = "manifest.json"
+
 def validate_data(data):
     """Validate the API response data"""
     if isinstance(data, str):
@@ -31,22 +43,17 @@ def validate_data(data):
     
     return data
 
+# Date fields rendered by the report, normalized once per column before formatting
+REPORT_DATE_FIELDS = (
+    'job_date', 'invoice_date', 'awb_bl_date', 'be_date', 'discharge_date', 'vessel_berthing',
+    'assessment_date', 'rail_out_date', 'examination_date', 'duty_paid_date', 'out_of_charge',
+    'sims_date', 'pims_date', 'nfmims_date', 'do_validity',
+)
+CONTAINER_DATE_FIELDS = ('arrival_date', 'detention_from')
+
 def format_date(date_str):
     """Format date string to dd/mm/yyyy format"""
-    if not date_str:
-        return ""
-    try:
-        # Try multiple date formats
-        for fmt in ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y']:
-            try:
-                date_obj = datetime.strptime(date_str, fmt)
-                return date_obj.strftime('%d/%m/%Y')
-            except ValueError:
-                continue
-        return date_str
-    except Exception as e:
-        logger.warning(f"Failed to parse date {date_str}: {e}")
-        return date_str
+    return dates.to_dmy(date_str)
 
 def format_container_dates(containers, date_field):
     """Format container dates and handle multiple dates"""
@@ -68,19 +75,92 @@ def format_container_dates(containers, date_field):
         return valid_dates[0]
     return ",\n".join(valid_dates)
 
+STATUS_COLORS = {
+    "ETA Date Pending": "FFFFFF",  # white
+    "Estimated Time of Arrival": "FFFF99",  # Light Yellow
+    "Custom Clearance Completed": "CCFFFF",  # Light Blue
+    "PCV Done, Duty Payment Pending": "FFDBFF",  # Light Blue
+    "Discharged": "FFCC99",  # Light Orange
+    "BE Noted, Arrival Pending": "99CCFF",  # Light Purple
+    "BE Noted, Clearance Pending": "99CCFF",  # Light Purple
+    "Gateway IGM Filed": "FFCC99",  # Light Orange
+}
+DEFAULT_STATUS_COLOR = "FFFFFF"
+
 def get_cell_color(detailed_status):
     """Get cell color based on detailed status"""
-    color_map = {
-        "ETA Date Pending": "FFFFFF",  # white
-        "Estimated Time of Arrival": "FFFF99",  # Light Yellow
-        "Custom Clearance Completed": "CCFFFF",  # Light Blue
-        "PCV Done, Duty Payment Pending": "FFDBFF",  # Light Blue
-        "Discharged": "FFCC99",  # Light Orange
-        "BE Noted, Arrival Pending": "99CCFF",  # Light Purple
-        "BE Noted, Clearance Pending": "99CCFF",  # Light Purple
-        "Gateway IGM Filed": "FFCC99",  # Light Orange
-    }
-    return color_map.get(detailed_status, "FFFFFF")
+    return STATUS_COLORS.get(detailed_status, DEFAULT_STATUS_COLOR)
+
+def report_styles():
+    """Named styles used by the DSR report (fresh objects for each workbook)"""
+    center = Alignment(horizontal="center", vertical="center")
+    center_wrap = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    thin = Side(style='thin')
+    blue = PatternFill(start_color="4472C4", fill_type="solid")
+    styles = [
+        NamedStyle(name="reference_label", fill=blue, font=Font(color="FFFFFF", bold=True), alignment=center_wrap),
+        NamedStyle(name="title", fill=blue, font=Font(color="FFFFFF", size=12), alignment=center),
+        NamedStyle(name="header", fill=blue, font=Font(color="FFFFFF", bold=True), alignment=center),
+        NamedStyle(name="data", alignment=center_wrap, border=Border(left=thin, right=thin, top=thin, bottom=thin)),
+        NamedStyle(name="summary", fill=PatternFill(start_color="92D050", fill_type="solid"), alignment=center),
+    ]
+    for color in sorted(set(STATUS_COLORS.values()) | {DEFAULT_STATUS_COLOR}):
+        styles.append(NamedStyle(name=f"status_{color}", fill=PatternFill(start_color=color, fill_type="solid"),
+                                 font=Font(color="000000", bold=True), alignment=center_wrap))
+    return styles
+
+def format_report_row(row):
+    """Build the report row for a single job record"""
+    # Format job number and date
+    job_no_date = f"{row.get('job_no', '')} | {format_date(row.get('job_date', ''))} | {row.get('custom_house', '')} | {row.get('type_of_b_e', '')}"
+    
+    # Format invoice details
+    invoice_details = f"{row.get('invoice_number', '')} | {format_date(row.get('invoice_date', ''))}"
+    
+    # Calculate invoice value safely
+    try:
+        cif_amount = Decimal(str(row.get('cif_amount', 0)))
+        exrate = Decimal(str(row.get('exrate', 1)))
+        inv_value = (cif_amount / exrate).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError):
+        inv_value = Decimal('0.00')
+    
+    # Format container information
+    containers = row.get('container_nos', [])
+    container_numbers = ",\n".join(
+        f"{c.get('container_number', '')} - {c.get('size', '')}" 
+        for c in containers
+    )
+    
+    return [
+        job_no_date,
+        row.get('supplier_exporter', ''),
+        invoice_details,
+        f"{row.get('inv_currency', '')} | {inv_value} | {row.get('unit_price', '')}",
+        f"{row.get('awb_bl_no', '')} | {format_date(row.get('awb_bl_date', ''))}",
+        row.get('description', ''),
+        row.get('job_net_weight', ''),
+        f"POL: {row.get('loading_port', '').split('(')[0]}\nPOD: {row.get('port_of_reporting', '').split('(')[0]}",
+        format_container_dates(containers, 'arrival_date'),
+        row.get('free_time', ''),
+        format_container_dates(containers, 'detention_from'),
+        row.get('shipping_line_airline', ''),
+        container_numbers,
+        ",\n".join(str(c.get('weight_shortage', '')) for c in containers),
+        row.get('no_of_container', '')[:-2] if row.get('no_of_container') else '',
+        f"{row.get('be_no', '')} | {format_date(row.get('be_date', ''))}",
+        format_remarks(row),
+        row.get('detailed_status', '')
+    ]
+
+def iter_report_rows(rows):
+    """Yield formatted report rows, skipping rows that fail to format"""
+    for row in rows:
+        try:
+            yield format_report_row(row)
+        except Exception as e:
+            logger.error(f"Error processing row: {e}", exc_info=True)
+            continue
 
 def convert_to_excel(data, output_filename):
     """Convert JSON data to Excel report"""
@@ -96,9 +176,10 @@ def convert_to_excel(data, output_filename):
             return
         
         logger.info(f"Processing {len(rows)} rows of data")
+        dates.normalize_columns(rows, REPORT_DATE_FIELDS, CONTAINER_DATE_FIELDS)
         
-        wb = Workbook()
-        ws = wb.active
+        # Write-only workbook: rows are streamed to disk as they are appended
+        report = StreamingReport(styles=report_styles())
         
         # Get unique statuses for reference row
         unique_statuses = list(set(row.get('detailed_status', '') 
@@ -129,101 +210,136 @@ def convert_to_excel(data, output_filename):
             "DETAILED STATUS"
         ]
 
+        # Column widths must be declared before any row is streamed
+        set_column_widths(report, headers)
+
         # Add reference row
         reference_row = ["REFERENCE"] + unique_statuses
-        ws.append(reference_row)
-        for idx, cell in enumerate(ws[1], 1):
-            cell.fill = PatternFill(start_color="4472C4" if idx == 1 else get_cell_color(cell.value),
-                                fill_type="solid")
-            cell.font = Font(color="FFFFFF" if idx == 1 else "000000", bold=True)
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        report.append(reference_row, ["reference_label"] + [f"status_{get_cell_color(s)}" for s in unique_statuses])
+        report.append([])
 
         # Add title row
-        ws.merge_cells(f'A3:{get_column_letter(len(headers))}3')
-        title_cell = ws['A3']
-        title_cell.value = f"{rows[0].get('importer', '')}: Status as of {date_of_report}"
-        title_cell.fill = PatternFill(start_color="4472C4", fill_type="solid")
-        title_cell.font = Font(color="FFFFFF", size=12)
-        title_cell.alignment = Alignment(horizontal="center", vertical="center")
+        report.merge_next_row(len(headers))
+        report.append([f"{rows[0].get('importer', '')}: Status as of {date_of_report}"], "title")
 
         # Add headers row
-        ws.append(headers)
-        for cell in ws[4]:
-            cell.fill = PatternFill(start_color="4472C4", fill_type="solid")
-            cell.font = Font(color="FFFFFF", bold=True)
-            cell.alignment = Alignment(horizontal="center", vertical="center")
+        report.append(headers, "header")
 
         # Add data rows
-        for row in rows:
-            try:
-                # Format job number and date
-                job_no_date = f"{row.get('job_no', '')} | {format_date(row.get('job_date', ''))} | {row.get('custom_house', '')} | {row.get('type_of_b_e', '')}"
-                
-                # Format invoice details
-                invoice_details = f"{row.get('invoice_number', '')} | {format_date(row.get('invoice_date', ''))}"
-                
-                # Calculate invoice value safely
-                try:
-                    cif_amount = Decimal(str(row.get('cif_amount', 0)))
-                    exrate = Decimal(str(row.get('exrate', 1)))
-                    inv_value = (cif_amount / exrate).quantize(Decimal('0.01'))
-                except (decimal.InvalidOperation, TypeError):
-                    inv_value = Decimal('0.00')
-                
-                # Format container information
-                containers = row.get('container_nos', [])
-                container_numbers = ",\n".join(
-                    f"{c.get('container_number', '')} - {c.get('size', '')}" 
-                    for c in containers
-                )
-                
-                data_row = [
-                    job_no_date,
-                    row.get('supplier_exporter', ''),
-                    invoice_details,
-                    f"{row.get('inv_currency', '')} | {inv_value} | {row.get('unit_price', '')}",
-                    f"{row.get('awb_bl_no', '')} | {format_date(row.get('awb_bl_date', ''))}",
-                    row.get('description', ''),
-                    row.get('job_net_weight', ''),
-                    f"POL: {row.get('loading_port', '').split('(')[0]}\nPOD: {row.get('port_of_reporting', '').split('(')[0]}",
-                    format_container_dates(containers, 'arrival_date'),
-                    row.get('free_time', ''),
-                    format_container_dates(containers, 'detention_from'),
-                    row.get('shipping_line_airline', ''),
-                    container_numbers,
-                    ",\n".join(str(c.get('weight_shortage', '')) for c in containers),
-                    row.get('no_of_container', '')[:-2] if row.get('no_of_container') else '',
-                    f"{row.get('be_no', '')} | {format_date(row.get('be_date', ''))}",
-                    format_remarks(row),
-                    row.get('detailed_status', '')
-                ]
-                
-                ws.append(data_row)
-                
-                # Format data row
-                row_num = ws.max_row
-                for cell in ws[row_num]:
-                    cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-                    cell.border = Border(
-                        left=Side(style='thin'),
-                        right=Side(style='thin'),
-                        top=Side(style='thin'),
-                        bottom=Side(style='thin')
-                    )
-            except Exception as e:
-                logger.error(f"Error processing row: {e}", exc_info=True)
-                continue
-
-        add_summary_section(ws, rows)
-        set_column_widths(ws, headers)
+        report.append_rows(iter_report_rows(rows), "data")
+
+        add_summary_section(report, rows)
         
-        wb.save(output_filename)
+        report.save(output_filename)
         logger.info(f"Successfully saved report to {output_filename}")
         
     except Exception as e:
         logger.error(f"Error in convert_to_excel: {e}", exc_info=True)
         raise
 
+def importer_groups(rows):
+    """Group rows by importer (case and surrounding spaces ignored), in first-seen order"""
+    groups = {}
+    for row in rows:
+        name = str(row.get('importer') or '').strip()
+        groups.setdefault(name.casefold(), (name, []))[1].append(row)
+    return list(groups.values())
+
+def report_filename(importer, used):
+    """A file name for the importer's report that is safe on disk and unique within ``used``"""
+    stem = re.sub(r'[^A-Za-z0-9]+', '_', importer).strip('_')[:80] or "UNKNOWN_IMPORTER"
+    name, n = f"{stem}.xlsx", 1
+    while name.lower() in used:
+        n += 1
+        name = f"{stem}_{n}.xlsx"
+    used.add(name.lower())
+    return name
+
+def render_importer_report(importer, rows, path):
+    """Write one importer's report; runs in a worker process and returns its manifest entry"""
+    start = time.perf_counter()
+    entry = {"importer": importer, "file": os.path.basename(path), "jobs": len(rows)}
+    tmp_path = f"{path}.tmp.xlsx"
+    try:
+        # Rendered under a temporary name, so a report that is cut off never looks finished
+        convert_to_excel(rows, tmp_path)
+        os.replace(tmp_path, path)
+        entry.update(status="ok", bytes=os.path.getsize(path))
+    except Exception as e:
+        entry.update(status="error", error=str(e))
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+def settle_unfinished(entry, path, started_at):
+    """Match an unfinished report's manifest entry to what is on disk"""
+    tmp_path = f"{path}.tmp.xlsx"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    if not os.path.exists(path):
+        return entry
+    if os.path.getmtime(path) >= started_at:
+        # Moved into place just before the pool was stopped
+        return dict(entry, status="ok", bytes=os.path.getsize(path))
+    os.remove(path)  # left over from an earlier run
+    return entry
+
+def convert_per_importer(data, output_dir, workers=None, timeout=None):
+    """Write one report per importer to ``output_dir`` in parallel, plus a manifest.
+
+    Reports are rendered across a pool of ``workers`` processes (default: one
+    per CPU). After ``timeout`` seconds the pool is terminated; reports not
+    finished by then are listed in the manifest with status "timeout" and
+    have no file in ``output_dir``. Returns the manifest.
+    """
+    rows = [row for row in validate_data(data) if isinstance(row, dict) and not row.get('bill_no')]
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    started_at = time.time()
+
+    used = set()
+    jobs = [(importer, group, str(output_dir / report_filename(importer, used)))
+            for importer, group in importer_groups(rows)]
+    logger.info(f"Rendering {len(jobs)} importer reports for {len(rows)} jobs into {output_dir}")
+
+    entries = {}
+    deadline = None if timeout is None else time.monotonic() + timeout
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+        results = [(job, pool.apply_async(render_importer_report, job)) for job in jobs]
+        for (importer, group, path), result in results:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                # Past the deadline this only collects reports that are already done
+                entries[path] = result.get(remaining)
+            except multiprocessing.TimeoutError:
+                pass
+    finally:
+        # Stops reports still rendering, so the wait really ends at the deadline
+        pool.terminate()
+        pool.join()
+    if len(entries) < len(jobs):
+        logger.error(f"{len(jobs) - len(entries)} importer reports did not finish within {timeout}s")
+    for importer, group, path in jobs:
+        if path not in entries:
+            entries[path] = settle_unfinished({"importer": importer, "file": os.path.basename(path),
+                                               "jobs": len(group), "status": "timeout"}, path, started_at)
+
+    reports = [entries[path] for _, _, path in jobs]
+    manifest = {
+        "generated_at": datetime.now().isoformat(timespec='seconds'),
+        "jobs": len(rows),
+        "importers": len(reports),
+        "failed": sum(entry["status"] != "ok" for entry in reports),
+        "seconds": round(time.perf_counter() - start, 3),
+        "reports": reports,
+    }
+    with open(output_dir / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Wrote {manifest['importers'] - manifest['failed']} of {manifest['importers']} "
+                f"importer reports in {manifest['seconds']}s")
+    return manifest
+
 def format_remarks(row):
     """Format remarks section with all dates and additional information"""
     remarks = []
@@ -263,42 +379,29 @@ def format_remarks(row):
         
     return " | ".join(remarks)
 
-def add_summary_section(ws, rows):
+def add_summary_section(report, rows):
     """Add summary section at the bottom of the worksheet"""
     # Add blank rows
-    ws.append([])
-    ws.append([])
+    report.append([])
+    report.append([])
     
-    summary_row = ws.max_row + 1
-    ws.merge_cells(f'A{summary_row}:E{summary_row}')
-    summary_cell = ws[f'A{summary_row}']
-    summary_cell.value = "SUMMARY"
-    summary_cell.fill = PatternFill(start_color="92D050", fill_type="solid")
-    summary_cell.alignment = Alignment(horizontal="center", vertical="center")
+    report.merge_next_row(5)
+    report.append(["SUMMARY"], "summary")
     
-    container_counts = {
-        '20_arrived': 0, '40_arrived': 0,
-        '20_transit': 0, '40_transit': 0
-    }
+    # Count over the flat container table instead of walking each job's nested list
+    containers = [container for row in rows for container in explode_containers(row)]
+    container_counts = count_containers(containers)
+    counts = [
+        container_counts[('20', 'arrived')],
+        container_counts[('40', 'arrived')],
+        container_counts[('20', 'transit')],
+        container_counts[('40', 'transit')],
+    ]
     
-    for row in rows:
-        for container in row.get('container_nos', []):
-            size = container.get('size', '')
-            is_arrived = bool(container.get('arrival_date'))
-            key = f"{size}_{'arrived' if is_arrived else 'transit'}"
-            if key in container_counts:
-                container_counts[key] += 1
-    
-    ws.append(['ARRIVED', '', 'IN TRANSIT', '', 'TOTAL'])
-    ws.append([
-        container_counts['20_arrived'],
-        container_counts['40_arrived'],
-        container_counts['20_transit'],
-        container_counts['40_transit'],
-        sum(container_counts.values())
-    ])
-
-def set_column_widths(ws, headers):
+    report.append(['ARRIVED', '', 'IN TRANSIT', '', 'TOTAL'])
+    report.append(counts + [sum(counts)])
+
+def set_column_widths(report, headers):
     """Set column widths based on content"""
     column_widths = {
         'JOB NO AND DATE': 25,
@@ -321,34 +424,51 @@ def set_column_widths(ws, headers):
         'DETAILED STATUS': 25
     }
 
-    for idx, header in enumerate(headers, 1):
-        ws.column_dimensions[get_column_letter(idx)].width = column_widths.get(header, 15)
+    report.set_column_widths([column_widths.get(header, 15) for header in headers])
+
+def fetch_data(api_url=API_URL):
+    """Fetch the Pending report records from the API"""
+    logger.info(f"Fetching data from {api_url}")
+    response = requests.get(api_url)
+    response.raise_for_status()  # Raise exception for bad status codes
+
+    # Log response details for debugging
+    logger.debug(f"Response status code: {response.status_code}")
+    logger.debug(f"Response content type: {response.headers.get('content-type', 'unknown')}")
+    logger.debug(f"First 200 characters of response: {response.text[:200]}")
+
+    try:
+        raw_data = response.json()
+        logger.debug(f"Successfully parsed JSON response")
+        if isinstance(raw_data, dict) and 'data' in raw_data:
+            return raw_data['data']
+        return raw_data
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON response: {e}")
+        raise ValueError("Invalid JSON received from API")
 
 def main():
     """Main function to fetch data and generate report"""
-    api_url = "http://43.205.59.159:9000/api/24-25/jobs/Pending/all"
-    
+    parser = argparse.ArgumentParser(description="Generate the DSR Excel report")
+    parser.add_argument("--per-importer", metavar="DIR",
+                        help="write one report per importer to DIR, with a manifest")
+    parser.add_argument("--workers", type=int, help="report processes (default: one per CPU)")
+    parser.add_argument("--timeout", type=float, help="seconds to wait for the importer reports")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="read the jobs from a saved job snapshot (e.g. jobs_np.arrow) instead of the API")
+    args = parser.parse_args()
+
     try:
-        logger.info(f"Fetching data from {api_url}")
-        response = requests.get(api_url)
-        response.raise_for_status()  # Raise exception for bad status codes
-        
-        # Log response details for debugging
-        logger.debug(f"Response status code: {response.status_code}")
-        logger.debug(f"Response content type: {response.headers.get('content-type', 'unknown')}")
-        logger.debug(f"First 200 characters of response: {response.text[:200]}")
-        
-        try:
-            raw_data = response.json()
-            logger.debug(f"Successfully parsed JSON response")
-            if isinstance(raw_data, dict) and 'data' in raw_data:
-                data = raw_data['data']
-            else:
-                data = raw_data
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {e}")
-            raise ValueError("Invalid JSON received from API")
-        
+        if args.snapshot:
+            from shared import snapshot_file
+            data = snapshot_file.read_records(args.snapshot)
+        else:
+            data = fetch_data()
+
+        if args.per_importer:
+            convert_per_importer(data, args.per_importer, args.workers, args.timeout)
+            return
+
         output_filename = f"Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
         convert_to_excel(data, output_filename)
         logger.info(f"Excel report generated: {output_filename}")
@@ -1,20 +1,20 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks
-import pandas as pd
-import uvicorn
-import requests
 import time
 import os
 import asyncio
 from typing import Dict, Any
 from threading import Thread, Event
 from logging import getLogger, basicConfig, INFO
-import requests
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 from datetime import datetime
-import json
 import logging
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared import render_pool, upstream, worker_mode
+from shared.dsr_report import HEADERS, format_lookup_row, format_row as format_report_row
+from shared.health import add_health_routes
+from shared.job_store import CONTAINER_FIELD, JobStore
+from shared.result_cache import ResultCache
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 basicConfig(level=INFO)
@@ -24,31 +24,12 @@ logger = getLogger(__name__)
 
 app = FastAPI(title="Container Details API")
 
-def validate_data(data):
-    """Validate and extract the required API response data"""
-    try:
-        if isinstance(data, str):
-            data = json.loads(data)
-
-        if isinstance(data, dict) and "data" in data:
-            data = data["data"]
-
-        if not isinstance(data, list):
-            raise ValueError("API response is not in expected format (list)")
-        
-        return data
-    except Exception as e:
-        logger.error(f"Data validation failed: {e}")
-        raise
+fetch_status = {"last_run": None, "last_report": None, "error": None}
 
 def format_date(date_str):
     """Formats the date field to avoid empty values"""
     return date_str if date_str else ""
 
-def format_container_dates(containers, key):
-    """Formats the container-related dates"""
-    return ",\n".join(c.get(key, '') for c in containers)
-
 def format_remarks(row):
     """Formats remarks field"""
     return row.get('remarks', '') if row.get('remarks') else ''
@@ -81,6 +62,7 @@ def set_column_widths(ws, headers):
 
 def style_header(ws, headers):
     """Apply styling to the header row (bold, centered, highlighted)."""
+    from openpyxl.styles import PatternFill, Font, Alignment
     header_fill = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")  # Light Yellow
     header_font = Font(bold=True)
     header_alignment = Alignment(horizontal="center", vertical="center")
@@ -93,30 +75,30 @@ def style_header(ws, headers):
 
 def style_data(ws, start_row, end_row, num_columns):
     """Apply center alignment to all data cells."""
+    from openpyxl.styles import Alignment
     data_alignment = Alignment(horizontal="center", vertical="center")
 
     for row in range(start_row, end_row + 1):
         for col in range(1, num_columns + 1):
             ws.cell(row=row, column=col).alignment = data_alignment
 
-def convert_to_excel(data):
-    """Convert JSON data to Excel with formatted headers and aligned data."""
-    try:
-        data = validate_data(data)
-        
-        if not data:
-            logger.warning("No valid data to export")
-            return None
+# Snapshot rows are report rows, formatted once per changed job.
+SNAPSHOT_FILE = "jobs_app.arrow"  # one snapshot (and leader lock) per service
+job_store = JobStore(row_formatter=format_report_row, snapshot_path=SNAPSHOT_FILE)
+add_health_routes(app, job_store)
+
+def write_report(rows):
+    """Write already formatted report rows to the Excel file."""
+    # openpyxl is only needed for the export, so it is not loaded at startup
+    from openpyxl import Workbook
+    from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
 
+    try:
         wb = Workbook()
         ws = wb.active
 
-        headers = [
-            "JOB NO AND DATE", "IMPORTER", "SUPPLIER/ EXPORTER", "INVOICE NUMBER AND DATE",
-            "INVOICE VALUE AND UNIT PRICE", "BL NUMBER AND DATE", "COMMODITY", "NET WEIGHT",
-            "PORT", "ARRIVAL DATE", "FREE TIME", "DETENTION FROM", "SHIPPING LINE",
-            "CONTAINER NUM & SIZE", "NUMBER OF CONTAINERS", "BE NUMBER AND DATE", "REMARKS", "DETAILED STATUS",
-        ]
+        headers = HEADERS
         ws.append(headers)
 
         # Apply column width settings
@@ -128,39 +110,7 @@ def convert_to_excel(data):
         start_data_row = 2  # Since headers are in row 1
         row_count = start_data_row  # Track data rows
 
-        for row in data:
-            containers = row.get('container_nos', [])
-            job_no_date = f"{row.get('job_no', '')} | {row.get('job_date', '')} | {row.get('custom_house', '')} | {row.get('type_of_b_e', '')}"
-            invoice_details = f"{row.get('invoice_number', '')} | {row.get('invoice_date', '')}"
-            bl_details = f"{row.get('awb_bl_no', '')} | {row.get('awb_bl_date', '')}"
-            remark_detail = (
-                f"Discharge_Date: {row.get('discharge_date', '')} | "
-                f"Arrival_Date: {row.get('assessment_date', '')} | "
-                f"Duty_Paid_Date: {row.get('duty_paid_date', '')} | "
-                f"DO_Validity_Upto_Job_Level: {row.get('do_validity_upto_job_level', '')}"
-            )
-            container_numbers = ", ".join(f"{c.get('container_number', '')} - {c.get('size', '')}" for c in row.get('container_nos', []))
-
-            data_row = [
-                job_no_date,
-                row.get('importer', ''),
-                row.get('supplier_exporter', ''),
-                invoice_details,
-                f"{row.get('inv_currency', '')} {row.get('invoice_value', '')} | {row.get('unit_price', '')}",
-                bl_details,
-                row.get('description', ''),
-                row.get('job_net_weight', ''),
-                f"POL: {row.get('loading_port', '')} POD: {row.get('port_of_reporting', '')}",
-                format_container_dates(containers, 'arrival_date'),
-                row.get('free_time', ''),
-                format_container_dates(containers, 'detention_from'),
-                row.get('shipping_line_airline', ''),
-                container_numbers,
-                row.get('no_of_container', ''),
-                f"{row.get('be_no', '')} | {row.get('be_date', '')}",
-                remark_detail,
-                row.get('detailed_status', ''),
-            ]
+        for data_row in rows:
             ws.append(data_row)
             row_count += 1
 
@@ -181,32 +131,28 @@ def convert_to_excel(data):
 
 
 
-def get_container_data(container_number):
+# Formatted lookups per snapshot version; misses are kept for a minute only.
+container_cache = ResultCache(maxsize=1024, ttl=300, negative_ttl=60)
+job_cache = ResultCache(maxsize=1024, ttl=300, negative_ttl=60)
 
-    file_path = "Namdeo.xlsx"
-    df = pd.read_excel(file_path, dtype=str)  
-    df = df.fillna("Not Available")
-    df.columns = df.columns.astype(str).str.strip()
-    container_column = "CONTAINER NUM & SIZE"
-    if container_column not in df.columns:
-        return f"❌ Error: Column '{container_column}' not found in the Excel file."
 
-    df[container_column] = df[container_column].str.upper()
+def get_container_data(container_number):
     container_number = container_number.upper()
-    filtered_df = df[df[container_column].str.contains(container_number, na=False, case=False)]
-
-    if filtered_df.empty:
+    snapshot = job_store.current
+    formatted_output = container_cache.get_or_compute(
+        container_number, snapshot.version,
+        lambda key: format_container_data(key, snapshot.first(CONTAINER_FIELD, key)))
+    if formatted_output is None:
         return f"\n❌ No data found for container number: {container_number}\n"
-    row = filtered_df.iloc[0]
-    expected_columns = [
-        "JOB NO AND DATE", "IMPORTER", "SUPPLIER/ EXPORTER", "INVOICE NUMBER AND DATE",
-        "INVOICE VALUE AND UNIT PRICE", "BL NUMBER AND DATE", "COMMODITY", "NET WEIGHT",
-        "PORT", "ARRIVAL DATE", "FREE TIME", "DETENTION FROM", "SHIPPING LINE",
-        "CONTAINER NUM & SIZE", "NUMBER OF CONTAINERS", "BE NUMBER AND DATE",
-        "REMARKS", "DETAILED STATUS"
-    ]
+    return formatted_output
+
+
+def format_container_data(container_number, report_row):
+    """Container details text for a report row, or None if there is no row"""
+    if report_row is None:
+        return None
 
-    details = {col: row.get(col, "Not Available") for col in expected_columns}
+    details = format_lookup_row(report_row)
 
     formatted_output = f"""
     📦 **Container Details for: {container_number}**
@@ -233,23 +179,21 @@ def get_container_data(container_number):
     return formatted_output
 
 def get_job_data(job_number: str):
-    file_path = "Namdeo.xlsx"
-    df = pd.read_excel(file_path, dtype=str).fillna("Not Available")
-    df.columns = df.columns.astype(str).str.strip()
-    
-    job_column = "JOB NO AND DATE"
-    if job_column not in df.columns:
-        return f"❌ Error: Column '{job_column}' not found in the Excel file."
-    
-    df[job_column] = df[job_column].str.upper()
     job_number = job_number.upper()
-    filtered_df = df[df[job_column].str.contains(job_number, na=False, case=False)]
-    
-    if filtered_df.empty:
+    snapshot = job_store.current
+    formatted_output = job_cache.get_or_compute(
+        job_number, snapshot.version, lambda key: format_job_data(key, snapshot.first("job_no", key)))
+    if formatted_output is None:
         return f"\n❌ No data found for job number: {job_number}\n"
-    
-    row = filtered_df.iloc[0]
-    details = {col: row.get(col, "Not Available") for col in df.columns}
+    return formatted_output
+
+
+def format_job_data(job_number, report_row):
+    """Job details text for a report row, or None if there is no row"""
+    if report_row is None:
+        return None
+
+    details = format_lookup_row(report_row)
     
     formatted_output = f"""
     📂 **Job Details for: {job_number}**
@@ -280,19 +224,21 @@ async def fetch_data():
     global fetch_status
     while True:
         try:
-            API_URL = "http://43.205.59.159:9000/api/download-report/24-25/Pending"
-            logger.info(f"Fetching data from {API_URL}")
-            response = requests.get(API_URL)
-            response.raise_for_status()
-            data = response.json()
-
-            output_filename = convert_to_excel(data)
-            if output_filename:
-                logger.info(f"Excel report generated: {output_filename}")
-            else:
-                fetch_status["error"] = "Failed to generate report"
+            logger.info(f"Fetching data from {upstream.API_URL}")
+            data = await upstream.fetch_json()
 
-        except requests.RequestException as e:
+            snapshot = job_store.publish(await asyncio.to_thread(job_store.build, data))
+            if not snapshot.has_changes:
+                logger.info("No job changes since the last refresh, keeping the current report")
+            else:
+                await asyncio.to_thread(job_store.persist, snapshot)
+                output_filename = await render_pool.render(write_report, snapshot.rows)
+                if output_filename:
+                    logger.info(f"Excel report generated: {output_filename}")
+                else:
+                    fetch_status["error"] = "Failed to generate report"
+
+        except Exception as e:
             fetch_status["error"] = str(e)
             logger.error(f"API request failed: {e}")
 
@@ -300,10 +246,17 @@ async def fetch_data():
 
 @app.on_event("startup")
 async def startup_event():
-    """Start background data fetching when FastAPI starts"""
-    background_task = asyncio.create_task(fetch_data())
+    """Start loading the last snapshot and fetching data in the background when FastAPI starts"""
+    background_task = asyncio.create_task(worker_mode.run(job_store, fetch_data))
     logger.info("Started background data fetch task")
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the pooled upstream connection"""
+    await upstream.close_client()
+    render_pool.shutdown()
+
 @app.get("/container/{container_number}")
 async def find_container_details(container_number: str):
     try:
@@ -316,6 +269,10 @@ async def find_container_details(container_number: str):
             status_code=500,
             detail="Internal server error while processing container details" )
 
+@app.get("/metrics/cache")
+async def cache_metrics():
+    return {"container": container_cache.stats(), "job": job_cache.stats()}
+
 @app.get("/job/{job_number}")
 async def find_job_details(job_number: str):
     try:
@@ -328,5 +285,5 @@ async def find_job_details(job_number: str):
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8080)
+    worker_mode.serve(app, __file__, host="127.0.0.1", port=8080)
 
@@ -1,5 +1,9 @@
 import pandas as pd
 import json
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.job_store import JobStore
 
 def json_to_excel(json_data, output_file='output.xlsx'):
     
@@ -155,27 +159,14 @@ def json_to_excel(json_data, output_file='output.xlsx'):
     print(f"Excel file '{output_file}' has been created successfully!")
 
 
-def search_container(excel_file, container_number):
-    try:
-        # Read the Excel file
-        df = pd.read_excel(excel_file)
-        df['container_nos'] = df['container_nos'].astype(str)
-        
-        # Search for the container number
-        mask = df['container_nos'].str.contains(container_number, na=False, case=False)
-        
-        if mask.any():
-            # Get the row data
-            row_data = df[mask].to_dict('records')[0]
-            print(f"Container {container_number} found!")
-            return row_data
-        else:
-            print(f"Container {container_number} not found.")
-            return None
-            
-    except Exception as e:
-        print(f"Error searching for container: {str(e)}")
-        return None
+def search_container(job_store, container_number):
+    # Exact lookup on the container number index
+    row_data = job_store.get_container(container_number)
+    if row_data is not None:
+        print(f"Container {container_number} found!")
+    else:
+        print(f"Container {container_number} not found.")
+    return row_data
 
    
 if __name__ == "__main__":
@@ -189,10 +180,12 @@ if __name__ == "__main__":
     
     output_file = 'output.xlsx'
     json_to_excel(data, output_file)
+    job_store = JobStore()
+    job_store.load(data)
     
     # Then search for a container
     container_number = "TLXU2013823"  # Replace with actual container number
-    result = search_container(output_file, container_number)
+    result = search_container(job_store, container_number)
     
     if result:
         # Print all details of the found container
@@ -1,27 +1,20 @@
-
-
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-import logging
-from datetime import datetime
-logger = logging.getLogger(__name__)
-from fastapi import FastAPI, BackgroundTasks
-import requests
 import asyncio
-from datetime import datetime
-import logging
-from openpyxl import Workbook
 import json
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
 import logging
+import sys
 from datetime import datetime
+from pathlib import Path
+from fastapi import FastAPI, HTTPException
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared import dsr_report, render_pool, upstream
+
+logger = logging.getLogger(__name__)
 
 
 app = FastAPI()
 
 # API URL
-API_URL = "http://43.205.59.159:9000/api/download-report/24-25/Pending"
+API_URL = upstream.API_URL
 
 # Store last fetch status
 fetch_status = {"last_run": None, "last_report": None, "error": None}
@@ -49,10 +42,6 @@ def format_date(date_str):
     """Formats the date field to avoid empty values"""
     return date_str if date_str else ""
 
-def format_container_dates(containers, key):
-    """Formats the container-related dates"""
-    return ",\n".join(c.get(key, '') for c in containers)
-
 def format_remarks(row):
     """Formats remarks field"""
     return row.get('remarks', '') if row.get('remarks') else ''
@@ -87,6 +76,7 @@ def set_column_widths(ws, headers):
 
 def style_header(ws, headers):
     """Apply styling to the header row (bold, centered, highlighted)."""
+    from openpyxl.styles import Alignment, Font, PatternFill
     header_fill = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")  # Light Yellow
     header_font = Font(bold=True)
     header_alignment = Alignment(horizontal="center", vertical="center")
@@ -99,6 +89,7 @@ def style_header(ws, headers):
 
 def style_data(ws, start_row, end_row, num_columns):
     """Apply center alignment to all data cells."""
+    from openpyxl.styles import Alignment
     data_alignment = Alignment(horizontal="center", vertical="center")
 
     for row in range(start_row, end_row + 1):
@@ -114,15 +105,13 @@ def convert_to_excel(data):
             logger.warning("No valid data to export")
             return None
 
+        # openpyxl is only needed for the report, so it is not loaded at startup
+        from openpyxl import Workbook
+
         wb = Workbook()
         ws = wb.active
 
-        headers = [
-            "JOB NO AND DATE", "IMPORTER", "SUPPLIER/ EXPORTER", "INVOICE NUMBER AND DATE",
-            "INVOICE VALUE AND UNIT PRICE", "BL NUMBER AND DATE", "COMMODITY", "NET WEIGHT",
-            "PORT", "ARRIVAL DATE", "FREE TIME", "DETENTION FROM", "SHIPPING LINE",
-            "CONTAINER NUM & SIZE", "NUMBER OF CONTAINERS", "BE NUMBER AND DATE", "REMARKS", "DETAILED STATUS",
-        ]
+        headers = dsr_report.HEADERS
         ws.append(headers)
 
         # Apply column width settings
@@ -134,39 +123,7 @@ def convert_to_excel(data):
         start_data_row = 2  # Since headers are in row 1
         row_count = start_data_row  # Track data rows
 
-        for row in data:
-            containers = row.get('container_nos', [])
-            job_no_date = f"{row.get('job_no', '')} | {row.get('job_date', '')} | {row.get('custom_house', '')} | {row.get('type_of_b_e', '')}"
-            invoice_details = f"{row.get('invoice_number', '')} | {row.get('invoice_date', '')}"
-            bl_details = f"{row.get('awb_bl_no', '')} | {row.get('awb_bl_date', '')}"
-            remark_detail = (
-                f"Discharge_Date: {row.get('discharge_date', '')} | "
-                f"Arrival_Date: {row.get('assessment_date', '')} | "
-                f"Duty_Paid_Date: {row.get('duty_paid_date', '')} | "
-                f"DO_Validity_Upto_Job_Level: {row.get('do_validity_upto_job_level', '')}"
-            )
-            container_numbers = ", ".join(f"{c.get('container_number', '')} - {c.get('size', '')}" for c in row.get('container_nos', []))
-
-            data_row = [
-                job_no_date,
-                row.get('importer', ''),
-                row.get('supplier_exporter', ''),
-                invoice_details,
-                f"{row.get('inv_currency', '')} {row.get('invoice_value', '')} | {row.get('unit_price', '')}",
-                bl_details,
-                row.get('description', ''),
-                row.get('job_net_weight', ''),
-                f"POL: {row.get('loading_port', '')} POD: {row.get('port_of_reporting', '')}",
-                format_container_dates(containers, 'arrival_date'),
-                row.get('free_time', ''),
-                format_container_dates(containers, 'detention_from'),
-                row.get('shipping_line_airline', ''),
-                container_numbers,
-                row.get('no_of_container', ''),
-                f"{row.get('be_no', '')} | {row.get('be_date', '')}",
-                remark_detail,
-                row.get('detailed_status', ''),
-            ]
+        for data_row in dsr_report.format_rows(data):
             ws.append(data_row)
             row_count += 1
 
@@ -255,11 +212,9 @@ async def fetch_data():
     while True:
         try:
             logger.info(f"Fetching data from {API_URL}")
-            response = requests.get(API_URL)
-            response.raise_for_status()
-            data = response.json()
+            data = await upstream.fetch_json(API_URL)
 
-            output_filename = convert_to_excel(data)
+            output_filename = await render_pool.render(convert_to_excel, data)
             if output_filename:
                 fetch_status["last_run"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 fetch_status["last_report"] = output_filename
@@ -268,7 +223,7 @@ async def fetch_data():
             else:
                 fetch_status["error"] = "Failed to generate report"
 
-        except requests.RequestException as e:
+        except Exception as e:
             fetch_status["error"] = str(e)
             logger.error(f"API request failed: {e}")
 
@@ -281,6 +236,20 @@ async def get_status():
     return fetch_status
 
 
+@app.get("/health")
+async def health():
+    """Answers as soon as the app is bound"""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """503 until the first report has been generated"""
+    if fetch_status["last_report"] is None:
+        raise HTTPException(status_code=503, detail="No report has been generated yet.")
+    return {"status": "ready", "last_run": fetch_status["last_run"], "last_report": fetch_status["last_report"]}
+
+
 @app.on_event("startup")
 async def startup_event():
     """Start background data fetching when FastAPI starts"""
@@ -288,6 +257,13 @@ async def startup_event():
     logger.info("Started background data fetch task")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the pooled upstream connection"""
+    await upstream.close_client()
+    render_pool.shutdown()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
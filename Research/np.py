@@ -1,17 +1,17 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
-import pandas as pd
-import uvicorn
-import httpx
+from fastapi import FastAPI, HTTPException, Request
 import asyncio
 from typing import Dict, List, Optional
 from datetime import datetime
 from pathlib import Path
 import logging
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.utils import get_column_letter
-from functools import lru_cache
+import sys
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared import dsr_report, render_pool, upstream, worker_mode
+from shared.health import add_health_routes
+from shared.job_store import CONTAINER_FIELD, JobStore
+from shared.report_artifacts import ReportArtifacts, content_key, file_response
+from shared.result_cache import ResultCache
+from shared.single_flight import SingleFlight
 
 # Configure logging
 logging.basicConfig(
@@ -22,8 +22,13 @@ logger = logging.getLogger(__name__)
 
 # Constants
 EXCEL_FILE = "Namdeo.xlsx"
-API_URL = "http://43.205.59.159:9000/api/download-report/24-25/Pending"
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+REPORT_DIR = "reports"
+REPORT_FORMAT_VERSION = 1  # bump when the workbook layout changes, so reports are re-rendered
+SNAPSHOT_FILE = "jobs_np.arrow"  # one snapshot (and leader lock) per service
+API_URL = upstream.API_URL
 REFRESH_INTERVAL = 300  # 5 minutes
+NEGATIVE_CACHE_TTL = 60  # seconds a "not found" lookup is cached
 COLUMN_WIDTHS = {
     'JOB NO AND DATE': 40,
     'SUPPLIER/ EXPORTER': 40,
@@ -45,105 +50,80 @@ COLUMN_WIDTHS = {
     'DETAILED STATUS': 35
 }
 
-HEADERS = [
-    "JOB NO AND DATE", "IMPORTER", "SUPPLIER/ EXPORTER", "INVOICE NUMBER AND DATE",
-    "INVOICE VALUE AND UNIT PRICE", "BL NUMBER AND DATE", "COMMODITY", "NET WEIGHT",
-    "PORT", "ARRIVAL DATE", "FREE TIME", "DETENTION FROM", "SHIPPING LINE",
-    "CONTAINER NUM & SIZE", "NUMBER OF CONTAINERS", "BE NUMBER AND DATE", "REMARKS", 
-    "DETAILED STATUS"
-]
+HEADERS = dsr_report.HEADERS
 
 app = FastAPI(title="Container Details API")
 
 class ExcelFormatter:
     @staticmethod
-    def style_header(ws):
-        """Apply styling to the header row"""
-        header_style = {
-            'fill': PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid"),
-            'font': Font(bold=True),
-            'alignment': Alignment(horizontal="center", vertical="center")
-        }
-        
-        for col, header in enumerate(HEADERS, start=1):
-            cell = ws.cell(row=1, column=col)
-            cell.fill = header_style['fill']
-            cell.font = header_style['font']
-            cell.alignment = header_style['alignment']
-            ws.column_dimensions[get_column_letter(col)].width = COLUMN_WIDTHS.get(header, 20)
+    def named_styles() -> List["NamedStyle"]:
+        """Header and data cell styles, registered once per workbook"""
+        from openpyxl.styles import PatternFill, Font, Alignment, NamedStyle
+
+        return [
+            NamedStyle(
+                name="header",
+                fill=PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid"),
+                font=Font(bold=True),
+                alignment=Alignment(horizontal="center", vertical="center")
+            ),
+            NamedStyle(name="data", alignment=Alignment(horizontal="center", vertical="center")),
+        ]
 
     @staticmethod
-    def style_data(ws, row_count: int):
-        """Apply styling to data cells"""
-        alignment = Alignment(horizontal="center", vertical="center")
-        for row in range(2, row_count + 1):
-            for col in range(1, len(HEADERS) + 1):
-                ws.cell(row=row, column=col).alignment = alignment
+    def column_widths() -> List[int]:
+        """Column widths in header order"""
+        return [COLUMN_WIDTHS.get(header, 20) for header in HEADERS]
 
 class DataProcessor:
     @staticmethod
     async def fetch_api_data():
         """Fetch data from API asynchronously"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(API_URL)
-                response.raise_for_status()
-                return response.json().get('data', [])
-            except Exception as e:
-                logger.error(f"API fetch error: {e}")
-                return []
+        try:
+            data = await upstream.fetch_json(API_URL)
+            return data.get('data', []) if isinstance(data, dict) else data
+        except Exception as e:
+            logger.error(f"API fetch error: {e}")
+            return []
 
     @staticmethod
     def format_row_data(row: Dict) -> List:
         """Format a single row of data"""
-        containers = row.get('container_nos', [])
-        return [
-            f"{row.get('job_no', '')} | {row.get('job_date', '')} | {row.get('custom_house', '')} | {row.get('type_of_b_e', '')}",
-            row.get('importer', ''),
-            row.get('supplier_exporter', ''),
-            f"{row.get('invoice_number', '')} | {row.get('invoice_date', '')}",
-            f"{row.get('inv_currency', '')} {row.get('invoice_value', '')} | {row.get('unit_price', '')}",
-            f"{row.get('awb_bl_no', '')} | {row.get('awb_bl_date', '')}",
-            row.get('description', ''),
-            row.get('job_net_weight', ''),
-            f"POL: {row.get('loading_port', '')} POD: {row.get('port_of_reporting', '')}",
-            ",\n".join(c.get('arrival_date', '') for c in containers),
-            row.get('free_time', ''),
-            ",\n".join(c.get('detention_from', '') for c in containers),
-            row.get('shipping_line_airline', ''),
-            ", ".join(f"{c.get('container_number', '')} - {c.get('size', '')}" for c in containers),
-            row.get('no_of_container', ''),
-            f"{row.get('be_no', '')} | {row.get('be_date', '')}",
-            (f"Discharge_Date: {row.get('discharge_date', '')} | "
-             f"Arrival_Date: {row.get('assessment_date', '')} | "
-             f"Duty_Paid_Date: {row.get('duty_paid_date', '')} | "
-             f"DO_Validity_Upto_Job_Level: {row.get('do_validity_upto_job_level', '')}"),
-            row.get('detailed_status', '')
-        ]
+        return dsr_report.format_row(row)
+
+# Snapshot rows are report rows, formatted once per changed job.
+job_store = JobStore(row_formatter=DataProcessor.format_row_data, snapshot_path=SNAPSHOT_FILE)
+add_health_routes(app, job_store)
+
+# Formatted container details, keyed by normalized number and snapshot version
+container_cache = ResultCache(maxsize=1024, ttl=REFRESH_INTERVAL, negative_ttl=NEGATIVE_CACHE_TTL)
 
 class ContainerService:
     @staticmethod
-    @lru_cache(maxsize=100)
     def get_container_details(container_number: str) -> str:
         """Get container details with caching"""
         try:
-            df = pd.read_excel(EXCEL_FILE, dtype=str)
-            df = df.fillna("Not Available")
+            snapshot = job_store.current
+            details = container_cache.get_or_compute(
+                container_number, snapshot.version,
+                lambda key: ContainerService._lookup(snapshot, key))
             
-            container_number = container_number.upper()
-            filtered_df = df[df["CONTAINER NUM & SIZE"].str.upper().str.contains(container_number)]
+            if details is None:
+                return f"\n❌ No data found for container number: {container_number.strip().upper()}\n"
             
-            if filtered_df.empty:
-                return f"\n❌ No data found for container number: {container_number}\n"
-            
-            row = filtered_df.iloc[0]
-            details = {col: row.get(col, "Not Available") for col in HEADERS}
-            
-            return ContainerService._format_container_output(container_number, details)
+            return details
         except Exception as e:
             logger.error(f"Error getting container details: {e}")
             raise HTTPException(status_code=500, detail="Error processing container details")
 
+    @staticmethod
+    def _lookup(snapshot, container_number: str) -> Optional[str]:
+        """Formatted details of a container in ``snapshot``, or None if it is unknown"""
+        report_row = snapshot.first(CONTAINER_FIELD, container_number)
+        if report_row is None:
+            return None
+        return ContainerService._format_container_output(container_number, dsr_report.format_lookup_row(report_row))
+
     @staticmethod
     def _format_container_output(container_number: str, details: Dict) -> str:
         """Format container details output"""
@@ -152,26 +132,53 @@ class ContainerService:
             [f'✅ **{header}:** {details[header]}' for header in HEADERS]
         )
 
+def build_excel_file(rows: List[List], path: str = EXCEL_FILE) -> str:
+    """Stream the report workbook to disk (CPU-bound, runs in the render pool)"""
+    # openpyxl is imported on the first export rather than at startup
+    from shared.excel_export import StreamingReport
+
+    report = StreamingReport(styles=ExcelFormatter.named_styles())
+    report.set_column_widths(ExcelFormatter.column_widths())
+    report.append(HEADERS, "header")
+    report.append_rows(rows, "data")
+    return report.save(path)
+
+# Rendered reports, named by a hash of the rows they were built from
+report_artifacts = ReportArtifacts(REPORT_DIR)
+
+async def update_report(snapshot):
+    """Render the report for ``snapshot`` unless one with the same content is stored"""
+    key = content_key(REPORT_FORMAT_VERSION, HEADERS, snapshot.rows)
+    if report_artifacts.reuse(key):
+        logger.info(f"Report {key[:12]} is unchanged, skipping the render")
+        return report_artifacts.path(key)
+    rendered = await render_pool.render(build_excel_file, snapshot.rows, report_artifacts.temp_path(key))
+    path = report_artifacts.store(key, rendered)
+    logger.info(f"Excel file updated at {datetime.now()}")
+    return path
+
+# At most one fetch/rebuild runs at a time; overlapping refreshes share it.
+refresh_flight = SingleFlight()
+
+async def _refresh():
+    data = await DataProcessor.fetch_api_data()
+    if not data:
+        return job_store.current
+    snapshot = job_store.publish(await asyncio.to_thread(job_store.build, data))
+    if snapshot.has_changes:
+        await asyncio.to_thread(job_store.persist, snapshot)
+    await update_report(snapshot)
+    return snapshot
+
+async def refresh_data():
+    """Fetch, rebuild and re-render, or join the refresh already in progress"""
+    return await refresh_flight.do("refresh", _refresh)
+
 async def update_excel_file():
     """Update Excel file periodically"""
     while True:
         try:
-            data = await DataProcessor.fetch_api_data()
-            if data:
-                wb = Workbook()
-                ws = wb.active
-                ws.append(HEADERS)
-                
-                for row in data:
-                    ws.append(DataProcessor.format_row_data(row))
-                
-                formatter = ExcelFormatter()
-                formatter.style_header(ws)
-                formatter.style_data(ws, len(data) + 1)
-                
-                wb.save(EXCEL_FILE)
-                logger.info(f"Excel file updated at {datetime.now()}")
-                ContainerService.get_container_details.cache_clear()
+            await refresh_data()
         except Exception as e:
             logger.error(f"Error updating Excel file: {e}")
         
@@ -179,20 +186,49 @@ async def update_excel_file():
 
 @app.on_event("startup")
 async def startup_event():
-    """Start background tasks"""
-    asyncio.create_task(update_excel_file())
+    """Start loading the last snapshot and the refresh loop in the background"""
+    asyncio.create_task(worker_mode.run(job_store, update_excel_file))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the pooled upstream connection"""
+    await upstream.close_client()
+    render_pool.shutdown()
 
 @app.get("/container/{container_number}")
 async def get_container_details(container_number: str):
     """API endpoint to get container details"""
     return ContainerService.get_container_details(container_number)
 
+@app.post("/refresh")
+async def refresh():
+    """Refresh the job data now; joins a refresh that is already running"""
+    if not worker_mode.is_leader():
+        raise HTTPException(status_code=409, detail="Refreshes run on the leader worker")
+    try:
+        snapshot = await refresh_data()
+    except Exception as e:
+        logger.error(f"Error refreshing data: {e}")
+        raise HTTPException(status_code=502, detail="Error refreshing data")
+    return {"version": snapshot.version, "jobs": len(snapshot),
+            "changes": {kind: len(keys) for kind, keys in snapshot.changes.items()}}
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """Hit/miss/eviction counters of the container lookup cache"""
+    return container_cache.stats()
+
 @app.get("/download-excel")
-async def download_excel():
-    """API endpoint to download the Excel file"""
-    if not Path(EXCEL_FILE).exists():
+async def download_excel(request: Request):
+    """API endpoint to download the Excel file; answers 304 if the client's copy is current"""
+    current = report_artifacts.current()
+    if current is None:
+        raise HTTPException(status_code=404, detail="Excel file not found")
+    key, path = current
+    try:
+        return file_response(request, key, path, filename=EXCEL_FILE, media_type=EXCEL_MEDIA_TYPE)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Excel file not found")
-    return FileResponse(path=EXCEL_FILE, filename=EXCEL_FILE, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    worker_mode.serve(app, __file__, host="127.0.0.1", port=8000)
\ No newline at end of file
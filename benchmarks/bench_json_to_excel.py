@@ -0,0 +1,90 @@
+"""Benchmark the formatted ``json_to_excel`` export.
+
+Compares the old write / reopen / restyle / save approach from ``B.py`` with
+the single-pass ``shared.excel_export.write_frame`` on the same records and
+reports wall time and peak Python heap (tracemalloc) for each.
+
+    python benchmarks/bench_json_to_excel.py [records.json] [--scale N]
+
+Without a JSON file the records are read back from ``output.xlsx``.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Alignment
+from openpyxl.utils import get_column_letter
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+from shared.excel_export import write_frame
+
+
+def reopen_and_style(df, path):
+    """The previous B.py approach: save, reload, restyle every cell, save again."""
+    df.to_excel(path, index=False, engine='openpyxl')
+    wb = load_workbook(path)
+    ws = wb.active
+    for col_num, _ in enumerate(df.columns, 1):
+        col_letter = get_column_letter(col_num)
+        ws.column_dimensions[col_letter].width = 30
+        for cell in ws[col_letter]:
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+    wb.save(path)
+
+
+def single_pass(df, path):
+    write_frame(df, path, column_width=30)
+
+
+def load_frame(source, scale):
+    if source:
+        with open(source) as f:
+            records = json.load(f)
+        if isinstance(records, dict) and "data" in records:
+            records = records["data"]
+        df = pd.DataFrame(records)
+    else:
+        df = pd.read_excel(ROOT / "output.xlsx", dtype={'job_no': str})
+    return pd.concat([df] * scale, ignore_index=True) if scale > 1 else df
+
+
+def measure(func, df, path):
+    start = time.perf_counter()
+    func(df, path)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(df, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", nargs="?", help="JSON file with the Pending report records")
+    parser.add_argument("--scale", type=int, default=1, help="repeat the records N times")
+    args = parser.parse_args()
+
+    df = load_frame(args.source, args.scale)
+    print(f"{len(df)} rows x {len(df.columns)} columns")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, func in (("reopen_and_style", reopen_and_style), ("single_pass", single_pass)):
+            results[name] = measure(func, df, os.path.join(tmp, f"{name}.xlsx"))
+            elapsed, peak, size = results[name]
+            print(f"{name:>18}: {elapsed:7.2f} s  peak {peak / 2**20:8.1f} MiB  file {size / 2**20:6.2f} MiB")
+    old, new = results["reopen_and_style"], results["single_pass"]
+    print(f"speed-up {old[0] / new[0]:.1f}x, peak memory {old[1] / max(new[1], 1):.1f}x lower")
+
+
+if __name__ == "__main__":
+    main()
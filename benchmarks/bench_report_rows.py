@@ -0,0 +1,163 @@
+"""Benchmark building the DSR report rows per record vs column at a time.
+
+Times ``shared.dsr_report.format_rows`` against column-at-a-time versions of
+the same formatter (``map`` over field lists, pandas string ops and, if
+pyarrow is installed, ``pyarrow.compute``), checks that every variant builds
+identical rows, and times writing the report workbook for scale.
+
+    python benchmarks/bench_report_rows.py records.json [--repeat N]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+from shared import dsr_report
+from shared.excel_export import StreamingReport
+
+COMPOSITES = {
+    "job": ("{} | {} | {} | {}", ("job_no", "job_date", "custom_house", "type_of_b_e")),
+    "invoice": ("{} | {}", ("invoice_number", "invoice_date")),
+    "value": ("{} {} | {}", ("inv_currency", "invoice_value", "unit_price")),
+    "bl": ("{} | {}", ("awb_bl_no", "awb_bl_date")),
+    "port": ("POL: {} POD: {}", ("loading_port", "port_of_reporting")),
+    "be": ("{} | {}", ("be_no", "be_date")),
+    "remarks": ("Discharge_Date: {} | Arrival_Date: {} | Duty_Paid_Date: {} | "
+                "DO_Validity_Upto_Job_Level: {}",
+                ("discharge_date", "assessment_date", "duty_paid_date", "do_validity_upto_job_level")),
+}
+PLAIN = ("importer", "supplier_exporter", "description", "job_net_weight", "free_time",
+         "shipping_line_airline", "no_of_container", "detailed_status")
+
+
+def assemble(c):
+    """Zip the finished columns back into report rows, in header order."""
+    return list(map(list, zip(
+        c["job"], c["importer"], c["supplier_exporter"], c["invoice"], c["value"], c["bl"],
+        c["description"], c["job_net_weight"], c["port"], c["arrival"], c["free_time"],
+        c["detention"], c["shipping_line_airline"], c["containers"], c["no_of_container"],
+        c["be"], c["remarks"], c["detailed_status"])))
+
+
+def container_lists(records, field):
+    return [[c.get(field, '') for c in r.get('container_nos', [])] for r in records]
+
+
+def rows_by_map(records):
+    def column(field):
+        return [r.get(field, '') for r in records]
+    c = {name: list(map(template.format, *map(column, fields)))
+         for name, (template, fields) in COMPOSITES.items()}
+    c.update((field, column(field)) for field in PLAIN)
+    c["arrival"] = list(map(",\n".join, container_lists(records, "arrival_date")))
+    c["detention"] = list(map(",\n".join, container_lists(records, "detention_from")))
+    c["containers"] = [", ".join(map("{} - {}".format, numbers, sizes)) for numbers, sizes
+                       in zip(container_lists(records, "container_number"), container_lists(records, "size"))]
+    return assemble(c)
+
+
+def rows_by_pandas(records):
+    def column(field):
+        return pd.Series([r.get(field, '') for r in records], dtype=object)
+    c = {}
+    for name, (template, fields) in COMPOSITES.items():
+        parts = template.split("{}")
+        out = pd.Series(parts[0], index=range(len(records)), dtype=object)
+        for field, sep in zip(fields, parts[1:]):
+            out = out + column(field).astype(str) + sep
+        c[name] = out.tolist()
+    c.update((field, column(field).tolist()) for field in PLAIN)
+    flat = pd.DataFrame(
+        [(i, f"{k.get('container_number', '')} - {k.get('size', '')}", k.get('arrival_date', ''),
+          k.get('detention_from', ''))
+         for i, r in enumerate(records) for k in r.get('container_nos', [])],
+        columns=["pos", "containers", "arrival", "detention"])
+    grouped = flat.groupby("pos", sort=False)
+    for name, sep in (("containers", ", "), ("arrival", ",\n"), ("detention", ",\n")):
+        c[name] = grouped[name].agg(sep.join).reindex(range(len(records)), fill_value="").tolist()
+    return assemble(c)
+
+
+def rows_by_arrow(records):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    def column(field):
+        return pa.array([str(r.get(field, '')) for r in records], pa.string())
+
+    def lists(field):
+        values = [str(v) for v in sum(container_lists(records, field), [])]
+        return pa.ListArray.from_arrays(offsets, pa.array(values, pa.string()))
+    offsets = pa.array([0] + list(_cumulative(len(r.get('container_nos', [])) for r in records)), pa.int32())
+    c = {}
+    for name, (template, fields) in COMPOSITES.items():
+        parts = template.split("{}")
+        out = column(fields[0])
+        for field, sep in zip(fields[1:], parts[1:]):
+            out = pc.binary_join_element_wise(out, column(field), sep)
+        c[name] = pc.binary_join_element_wise(parts[0], out, "").to_pylist()
+    c.update((field, [r.get(field, '') for r in records]) for field in PLAIN)
+    numbers = pc.binary_join_element_wise(lists("container_number").flatten(), lists("size").flatten(), " - ")
+    c["containers"] = pc.binary_join(pa.ListArray.from_arrays(offsets, numbers), ", ").to_pylist()
+    c["arrival"] = pc.binary_join(lists("arrival_date"), ",\n").to_pylist()
+    c["detention"] = pc.binary_join(lists("detention_from"), ",\n").to_pylist()
+    return assemble(c)
+
+
+def _cumulative(counts):
+    total = 0
+    for count in counts:
+        total += count
+        yield total
+
+
+def write_report(rows):
+    report = StreamingReport()
+    report.append(dsr_report.HEADERS)
+    report.append_rows(rows)
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as f:
+        report.save(f.name)
+
+
+def measure(func, repeat):
+    """Return the best wall time of ``repeat`` calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="JSON file with the Pending report records")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per variant")
+    args = parser.parse_args()
+
+    with open(args.source) as f:
+        records = json.load(f)
+    records = records["data"] if isinstance(records, dict) and "data" in records else records
+
+    expected = dsr_report.format_rows(records)
+    variants = {"per record": dsr_report.format_rows, "map": rows_by_map, "pandas": rows_by_pandas}
+    try:
+        import pyarrow  # noqa: F401
+        variants["pyarrow"] = rows_by_arrow
+    except ImportError:
+        pass
+    print(f"{len(records)} records")
+    for name, func in variants.items():
+        same = "" if func(records) == expected else "  (rows differ!)"
+        print(f"{name:>12}: {measure(lambda: func(records), args.repeat) * 1000:8.1f} ms{same}")
+    print(f"{'workbook':>12}: {measure(lambda: write_report(expected), 1) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark loading the job data from ``output.xlsx`` vs the Arrow snapshot.
+
+Writes the same records as an Arrow snapshot file (``shared.snapshot_file``)
+and times a cold load of each: ``pd.read_excel`` of the report, as the
+services did on startup, against memory-mapping the Arrow file (table only,
+and decoded back to job records).
+
+    python benchmarks/bench_snapshot_load.py [records.json] [--repeat N]
+
+Without a JSON file the records are read back from ``output.xlsx``.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+from shared import snapshot_file
+
+EXCEL_FILE = ROOT / "output.xlsx"
+
+
+def load_excel():
+    return pd.read_excel(EXCEL_FILE, dtype={'job_no': str}).to_dict(orient="records")
+
+
+def load_records(source):
+    if source:
+        with open(source) as f:
+            records = json.load(f)
+        return records["data"] if isinstance(records, dict) and "data" in records else records
+    return load_excel()
+
+
+def measure(func, repeat):
+    """Return the first and the best wall time of ``repeat`` calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times[0], min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", nargs="?", help="JSON file with the Pending report records")
+    parser.add_argument("--repeat", type=int, default=3, help="loads per format")
+    args = parser.parse_args()
+
+    records = load_records(args.source)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.arrow")
+        snapshot_file.write_records(records, path)
+        print(f"{len(records)} records; output.xlsx {EXCEL_FILE.stat().st_size / 2**20:.2f} MiB, "
+              f"snapshot {os.path.getsize(path) / 2**20:.2f} MiB")
+        results = {
+            "output.xlsx": measure(load_excel, args.repeat),
+            "arrow table": measure(lambda: snapshot_file.read_table(path), args.repeat),
+            "arrow records": measure(lambda: snapshot_file.read_records(path), args.repeat),
+        }
+    for name, (first, best) in results.items():
+        print(f"{name:>14}: first {first * 1000:9.1f} ms  best {best * 1000:9.1f} ms")
+    excel = results["output.xlsx"][0]
+    print(f"cold load speed-up: {excel / results['arrow table'][0]:.0f}x (table), "
+          f"{excel / results['arrow records'][0]:.0f}x (records)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Shared data layer used by the EXIM lookup and report services."""
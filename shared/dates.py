@@ -0,0 +1,95 @@
+"""Date normalization for the DSR reports.
+
+The Pending report carries dates as strings, mostly ``YYYY-MM-DD``, with the
+odd timestamp or ``dd/mm/yyyy`` entry and free text such as "Invalid Date".
+A full report renders several thousand of them but only a few hundred
+distinct values, so each raw string is parsed once and its renderings are
+memoized. :func:`normalize_columns` fills the memo a column at a time: the
+format is detected from the first value of the column and tried first for
+the rest, so the other formats are only attempted for irregular entries.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+# Accepted input formats, in the order they are tried.
+INPUT_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y')
+# Distinct raw strings memoized before the memo is reset.
+MAX_CACHED_DATES = 65536
+
+DateRendering = namedtuple('DateRendering', 'iso dmy')
+
+_renderings = {}
+
+
+def _parse(raw, formats):
+    for fmt in formats:
+        try:
+            return datetime.strptime(raw, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _render(raw, formats=INPUT_FORMATS):
+    """Parse and memoize ``raw``; ``None`` if no format matches."""
+    try:
+        return _renderings[raw]
+    except KeyError:
+        pass
+    parsed = _parse(raw, formats)
+    rendering = None if parsed is None else DateRendering(parsed.strftime('%Y-%m-%d'), parsed.strftime('%d/%m/%Y'))
+    if len(_renderings) >= MAX_CACHED_DATES:
+        _renderings.clear()
+    _renderings[raw] = rendering
+    return rendering
+
+
+def detect_format(values):
+    """The input format of the first non-blank value of ``values``, or ``None``."""
+    for value in values:
+        if value and isinstance(value, str):
+            for fmt in INPUT_FORMATS:
+                if _parse(value, (fmt,)):
+                    return fmt
+            return None
+    return None
+
+
+def normalize_column(values):
+    """Render every distinct date string in ``values``, trying the column's format first."""
+    distinct = {value for value in values if value and isinstance(value, str)}
+    fmt = detect_format(values)
+    formats = INPUT_FORMATS if fmt is None else (fmt,) + tuple(f for f in INPUT_FORMATS if f != fmt)
+    return {value: _render(value, formats) for value in distinct}
+
+
+def normalize_columns(records, fields=(), container_fields=()):
+    """Pre-parse the date ``fields`` of ``records`` and ``container_fields`` of their containers."""
+    for field in fields:
+        normalize_column([record.get(field) for record in records])
+    for field in container_fields:
+        normalize_column([container.get(field) for record in records
+                          for container in record.get('container_nos') or ()])
+
+
+def render(raw):
+    """The :class:`DateRendering` of ``raw``, or ``None`` if it is blank or not a date."""
+    if not raw or not isinstance(raw, str):
+        return None
+    return _render(raw)
+
+
+def to_dmy(raw):
+    """``raw`` as ``dd/mm/yyyy``; blanks become ``""`` and non-dates are returned unchanged."""
+    if not raw:
+        return ""
+    rendering = render(raw)
+    return rendering.dmy if rendering else raw
+
+
+def to_iso(raw):
+    """``raw`` as ``YYYY-MM-DD``; blanks become ``""`` and non-dates are returned unchanged."""
+    if not raw:
+        return ""
+    rendering = render(raw)
+    return rendering.iso if rendering else raw
@@ -0,0 +1,68 @@
+"""The 18-column DSR report row, shared by the report services.
+
+``format_row`` builds one report row from a Pending report job record. The
+job store calls it once per added or changed job, so a refresh only formats
+what changed; ``format_rows`` formats a whole record list for the one-off
+exports that have no job store. ``format_lookup_row`` turns a report row
+into the column -> value dict the lookup endpoints answer with.
+
+Rows are built per record on purpose: formatting is about 10 µs per job,
+and column-at-a-time variants (pandas string ops, ``pyarrow.compute``,
+``map`` over columns) measured slower for the Pending report, because the
+input is a list of dicts and openpyxl needs the rows back as lists. See
+``benchmarks/bench_report_rows.py``.
+"""
+
+HEADERS = [
+    "JOB NO AND DATE", "IMPORTER", "SUPPLIER/ EXPORTER", "INVOICE NUMBER AND DATE",
+    "INVOICE VALUE AND UNIT PRICE", "BL NUMBER AND DATE", "COMMODITY", "NET WEIGHT",
+    "PORT", "ARRIVAL DATE", "FREE TIME", "DETENTION FROM", "SHIPPING LINE",
+    "CONTAINER NUM & SIZE", "NUMBER OF CONTAINERS", "BE NUMBER AND DATE", "REMARKS", "DETAILED STATUS",
+]
+
+
+def format_container_dates(containers, key):
+    """Join one date field of every container, one per line."""
+    return ",\n".join(c.get(key, '') for c in containers)
+
+
+def format_row(row):
+    """Build the report row for a single job record."""
+    get = row.get
+    containers = get('container_nos', [])
+    return [
+        f"{get('job_no', '')} | {get('job_date', '')} | {get('custom_house', '')} | {get('type_of_b_e', '')}",
+        get('importer', ''),
+        get('supplier_exporter', ''),
+        f"{get('invoice_number', '')} | {get('invoice_date', '')}",
+        f"{get('inv_currency', '')} {get('invoice_value', '')} | {get('unit_price', '')}",
+        f"{get('awb_bl_no', '')} | {get('awb_bl_date', '')}",
+        get('description', ''),
+        get('job_net_weight', ''),
+        f"POL: {get('loading_port', '')} POD: {get('port_of_reporting', '')}",
+        format_container_dates(containers, 'arrival_date'),
+        get('free_time', ''),
+        format_container_dates(containers, 'detention_from'),
+        get('shipping_line_airline', ''),
+        ", ".join(f"{c.get('container_number', '')} - {c.get('size', '')}" for c in containers),
+        get('no_of_container', ''),
+        f"{get('be_no', '')} | {get('be_date', '')}",
+        (f"Discharge_Date: {get('discharge_date', '')} | "
+         f"Arrival_Date: {get('assessment_date', '')} | "
+         f"Duty_Paid_Date: {get('duty_paid_date', '')} | "
+         f"DO_Validity_Upto_Job_Level: {get('do_validity_upto_job_level', '')}"),
+        get('detailed_status', ''),
+    ]
+
+
+def format_rows(records):
+    """Report rows for every record, in order."""
+    return [format_row(record) for record in records]
+
+
+def format_lookup_row(report_row):
+    """Report row as a column -> value dict, with blanks shown as "Not Available"."""
+    return {
+        header: str(value) if value not in (None, "") else "Not Available"
+        for header, value in zip(HEADERS, report_row)
+    }
@@ -0,0 +1,119 @@
+"""Streaming Excel export for the DSR reports.
+
+Reports are written with openpyxl's write-only mode: each row is serialized
+to the sheet as soon as it is appended, so peak memory does not grow with the
+report size. Cell formatting is registered once per workbook as named styles
+and cells only reference them by name, instead of building and later
+deduplicating Alignment/Border objects for every cell.
+"""
+from itertools import repeat
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+from openpyxl.utils import get_column_letter
+
+
+class StreamingReport:
+    """A single-sheet write-only workbook.
+
+    ``styles`` are ``NamedStyle`` objects registered on the workbook; create
+    fresh ones for every report, since a named style binds to one workbook.
+    Column widths and merges must be declared before the affected rows are
+    appended, as rows are flushed immediately.
+    """
+
+    def __init__(self, styles=(), title=None):
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(title)
+        for style in styles:
+            self.workbook.add_named_style(style)
+        self.row_count = 0
+
+    def set_column_widths(self, widths, default=None):
+        """Set widths from a list (one per column) or a ``{column: width}`` dict."""
+        items = widths.items() if isinstance(widths, dict) else enumerate(widths, start=1)
+        for col, width in items:
+            if width is None:
+                width = default
+            if width is not None:
+                self.sheet.column_dimensions[get_column_letter(col)].width = width
+
+    def cell(self, value, style=None):
+        """Return a write-only cell carrying ``value`` and the named ``style``."""
+        cell = WriteOnlyCell(self.sheet)
+        if style:
+            cell.style = style
+        # Bound after the style, so a date keeps the number format it sets
+        cell.value = value
+        return cell
+
+    def _styled(self, values, styles):
+        """The cells of one row, each carrying its value and named style."""
+        return [self.cell(value, style) for value, style in zip(values, styles)]
+
+    def append(self, values, style=None):
+        """Write one row; ``style`` is a style name or a list with one per cell."""
+        if style is None:
+            row = values
+        elif isinstance(style, str):
+            row = self._styled(values, repeat(style))
+        else:
+            row = self._styled(values, style)
+        self.sheet.append(row)
+        self.row_count += 1
+        return self.row_count
+
+    def append_rows(self, rows, style=None):
+        """Write every row produced by the ``rows`` iterable."""
+        for values in rows:
+            self.append(values, style)
+        return self.row_count
+
+    def merge_next_row(self, last_column):
+        """Merge columns A..``last_column`` of the next row to be appended."""
+        row = self.row_count + 1
+        self.sheet.merged_cells.add(f"A{row}:{get_column_letter(last_column)}{row}")
+        return row
+
+    def save(self, path):
+        self.workbook.save(path)
+        return path
+
+
+def excel_value(value):
+    """Convert a DataFrame value to something openpyxl can write."""
+    if isinstance(value, (list, dict, tuple, set)):
+        return str(value)
+    if value is None or pd.isna(value):
+        return None
+    return value
+
+
+def frame_styles():
+    """Centered header and data styles used by :func:`write_frame`."""
+    thin = Side(style="thin")
+    center = Alignment(horizontal="center", vertical="center")
+    return [
+        NamedStyle(name="frame_header", font=Font(bold=True), alignment=center,
+                   border=Border(left=thin, right=thin, top=thin, bottom=thin)),
+        NamedStyle(name="frame_data", alignment=center),
+    ]
+
+
+def write_frame(df, path, column_width=30):
+    """Write ``df`` as a formatted sheet in a single streaming pass.
+
+    Every column gets ``column_width`` and every cell is centered, as the
+    ``json_to_excel`` exports used to do by saving with pandas, reopening the
+    file and restyling each cell.
+    """
+    report = StreamingReport(styles=frame_styles())
+    report.set_column_widths([column_width] * len(df.columns))
+    report.append([str(col) for col in df.columns], "frame_header")
+    report.append_rows(
+        ([excel_value(value) for value in row] for row in df.itertuples(index=False, name=None)),
+        "frame_data",
+    )
+    return report.save(path)
@@ -0,0 +1,21 @@
+"""Liveness and readiness endpoints for the lookup services.
+
+``/health`` answers as soon as the app is bound. ``/ready`` returns 503
+until the service's job store has a snapshot (restored from disk or
+fetched), then 200 with the live snapshot's version.
+"""
+from fastapi import HTTPException
+
+
+def add_health_routes(app, job_store):
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/ready")
+    async def ready():
+        if not job_store.is_loaded:
+            raise HTTPException(status_code=503, detail="Job data is not loaded yet.")
+        snapshot = job_store.current
+        return {"status": "ready", "version": snapshot.version, "jobs": len(snapshot),
+                "built_at": snapshot.built_at.isoformat()}
@@ -0,0 +1,473 @@
+"""In-memory job store shared by the EXIM lookup services.
+
+The refresh loop builds an immutable :class:`Snapshot` from the Pending report
+once per cycle and publishes it with a single reference swap. Lookups read the
+current snapshot without locking; a request that already holds a snapshot
+keeps using it even if a newer one is published meanwhile.
+"""
+import itertools
+import json
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+from functools import cached_property
+
+logger = logging.getLogger(__name__)
+
+# Record fields indexed for exact lookups, plus the nested container number.
+INDEXED_FIELDS = ("job_no", "be_no", "invoice_number", "cth_no")
+CONTAINER_FIELD = "container_number"
+# Fields covered by partial-ID search, in ranking order.
+SEARCH_FIELDS = ("job_no", CONTAINER_FIELD, "invoice_number", "be_no", "cth_no")
+# Columns of the normalized container table, one row per nested container.
+CONTAINER_COLUMNS = ("container_number", "size", "arrival_date", "detention_from", "weight_shortage")
+
+_versions = itertools.count(1)
+
+
+def normalize_key(value):
+    """Normalize an identifier for index lookups (trimmed, upper-case)."""
+    if value is None:
+        return ""
+    return str(value).strip().upper()
+
+
+def extract_records(payload):
+    """Return the list of job records from an API payload."""
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    if isinstance(payload, dict) and "data" in payload:
+        payload = payload["data"]
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        raise ValueError("API response is not in expected format (list)")
+    return [record for record in payload if isinstance(record, dict)]
+
+
+def container_numbers(record):
+    """Return the container numbers nested in a job record."""
+    containers = record.get("container_nos") or []
+    return [
+        c.get(CONTAINER_FIELD) for c in containers
+        if isinstance(c, dict) and c.get(CONTAINER_FIELD)
+    ]
+
+
+def explode_containers(record, key=None):
+    """Return the job's nested containers as flat rows of the container table.
+
+    Each row holds the :data:`CONTAINER_COLUMNS` plus ``job_key``, the key of
+    the job it belongs to.
+    """
+    if key is None:
+        key = job_key(record)
+    rows = []
+    for container in record.get("container_nos") or []:
+        if isinstance(container, dict):
+            row = {column: container.get(column) for column in CONTAINER_COLUMNS}
+            row["job_key"] = key
+            rows.append(row)
+    return tuple(rows)
+
+
+def count_containers(containers):
+    """Count container rows by ``(size, "arrived" | "transit")``."""
+    return Counter(
+        (str(c.get("size") or ""), "arrived" if c.get("arrival_date") else "transit")
+        for c in containers
+    )
+
+
+def job_key(record):
+    """Identity of a job across refreshes: its year-qualified job number."""
+    return (str(record.get("year") or ""), normalize_key(record.get("job_no")))
+
+
+def revision(record):
+    """Change marker of a job record, from its ``updatedAt`` and ``__v`` fields."""
+    return (record.get("updatedAt"), record.get("__v"))
+
+
+class JobEntry:
+    """A job record, what is derived from it and the revision it was built from.
+
+    ``row`` is the formatted row, ``containers`` the container table rows and
+    ``body`` the serialized response, if the store has a serializer.
+    """
+
+    __slots__ = ("record", "row", "revision", "containers", "body")
+
+    def __init__(self, record, row, revision, containers=(), body=None):
+        self.record = record
+        self.row = row
+        self.revision = revision
+        self.containers = containers
+        self.body = body
+
+    def is_current(self, record):
+        """True if ``record`` is the same revision this entry was built from."""
+        rev = revision(record)
+        if rev == (None, None):
+            return self.record == record
+        return self.revision == rev
+
+
+def index_keys(record):
+    """Yield ``(field, normalized key)`` pairs under which a record is indexed."""
+    for field in INDEXED_FIELDS:
+        key = normalize_key(record.get(field))
+        if key:
+            yield field, key
+    for number in container_numbers(record):
+        yield CONTAINER_FIELD, normalize_key(number)
+
+
+def build_indexes(jobs):
+    """Map each indexed field to ``{normalized key: [job keys]}``."""
+    indexes = {field: {} for field in INDEXED_FIELDS + (CONTAINER_FIELD,)}
+    for key, entry in jobs.items():
+        for field, value in index_keys(entry.record):
+            indexes[field].setdefault(value, []).append(key)
+    return indexes
+
+
+def update_indexes(indexes, old_jobs, new_jobs, touched, order):
+    """Copy-on-write update of ``indexes`` for the job keys in ``touched``.
+
+    Only the postings of touched jobs are rewritten, and kept in ``order``
+    (the new snapshot's job order) as :func:`build_indexes` would list them;
+    the previous snapshot's index dicts and lists are left untouched.
+    """
+    indexes = {field: dict(postings) for field, postings in indexes.items()}
+    copied = set()
+
+    def postings(field, value):
+        keys = indexes[field].get(value, [])
+        if (field, value) not in copied:
+            keys = list(keys)
+            indexes[field][value] = keys
+            copied.add((field, value))
+        return keys
+
+    for key in touched:
+        if key in old_jobs:
+            for field, value in index_keys(old_jobs[key].record):
+                keys = postings(field, value)
+                if key in keys:
+                    keys.remove(key)
+                if not keys:
+                    del indexes[field][value]
+                    copied.discard((field, value))
+        if key in new_jobs:
+            for field, value in index_keys(new_jobs[key].record):
+                keys = postings(field, value)
+                if key not in keys:
+                    keys.append(key)
+    rank = {key: i for i, key in enumerate(order)}
+    for field, value in copied:
+        indexes[field][value].sort(key=rank.__getitem__)
+    return indexes
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Trigram index for partial-ID search over :data:`SEARCH_FIELDS`.
+
+    Built from a snapshot's exact-match indexes: every distinct normalized
+    identifier is a token, and each trigram maps to the tokens containing
+    it. A query intersects the postings of its trigrams and only verifies
+    the few surviving tokens, so it never scans the job table.
+    """
+
+    def __init__(self, indexes, order):
+        self.rank = {key: i for i, key in enumerate(order)}
+        self.postings = {}
+        for field_rank, field in enumerate(SEARCH_FIELDS):
+            for token, keys in indexes[field].items():
+                self.postings.setdefault(token, []).extend((field_rank, key) for key in keys)
+        self.grams = {}
+        for token in self.postings:
+            for gram in trigrams(token):
+                self.grams.setdefault(gram, set()).add(token)
+
+    def candidates(self, query):
+        """Return the tokens that contain ``query``."""
+        if len(query) < 3:
+            return [token for token in self.postings if query in token]
+        grams = sorted(trigrams(query), key=lambda gram: len(self.grams.get(gram, ())))
+        tokens = set(self.grams.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not tokens:
+                break
+            tokens &= self.grams.get(gram, set())
+        return [token for token in tokens if query in token]
+
+    def search(self, value):
+        """Return the keys of jobs with an identifier containing ``value``, best first.
+
+        Exact matches rank before prefix, suffix and then inner matches; ties
+        go by field (:data:`SEARCH_FIELDS` order) and then snapshot order.
+        """
+        query = normalize_key(value)
+        if not query:
+            return []
+        best = {}
+        for token in self.candidates(query):
+            if token == query:
+                kind = 0
+            elif token.startswith(query):
+                kind = 1
+            elif token.endswith(query):
+                kind = 2
+            else:
+                kind = 3
+            for field_rank, key in self.postings[token]:
+                score = (kind, field_rank, self.rank[key])
+                if score < best.get(key, (4,)):
+                    best[key] = score
+        return sorted(best, key=best.get)
+
+
+class Snapshot:
+    """One immutable version of the job data and everything derived from it.
+
+    Snapshots are never modified after construction, so any number of
+    requests can read one concurrently while the next is being built.
+    ``changes`` lists the job keys added, changed and removed relative to the
+    snapshot it was derived from; ``diffable`` is False for snapshots that
+    must not serve as the base of an incremental build. ``partitions`` maps
+    a partition key (e.g. a normalized importer name) to its slice of
+    ``frame``.
+    """
+
+    def __init__(self, jobs, order, indexes, frame=None, changes=None, diffable=True, partitions=None,
+                 search_index=None):
+        self.version = next(_versions)
+        self.built_at = datetime.now()
+        self.jobs = jobs
+        self.order = order
+        self.indexes = indexes
+        self.frame = frame
+        self.changes = changes or {"added": [], "changed": [], "removed": []}
+        self.diffable = diffable
+        self.partitions = partitions or {}
+        self.search_index = search_index or SearchIndex(indexes, order)
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def has_changes(self):
+        return any(self.changes.values())
+
+    @cached_property
+    def records(self):
+        return [self.jobs[key].record for key in self.order]
+
+    @cached_property
+    def rows(self):
+        return [self.jobs[key].row for key in self.order]
+
+    @cached_property
+    def containers(self):
+        """The normalized container table, in job order."""
+        return [container for key in self.order for container in self.jobs[key].containers]
+
+    def find_containers(self, number):
+        """Return the container rows whose number equals ``number`` (normalized)."""
+        value = normalize_key(number)
+        return [
+            container
+            for key in self.indexes[CONTAINER_FIELD].get(value, [])
+            for container in self.jobs[key].containers
+            if normalize_key(container[CONTAINER_FIELD]) == value
+        ]
+
+    def entries(self, field, value):
+        """Return every job entry whose ``field`` equals ``value`` (normalized)."""
+        keys = self.indexes[field].get(normalize_key(value), [])
+        return [self.jobs[key] for key in keys]
+
+    def lookup(self, field, value):
+        """Return every row whose ``field`` equals ``value`` (normalized)."""
+        return [entry.row for entry in self.entries(field, value)]
+
+    def first(self, field, value):
+        """Return the first matching row or ``None``."""
+        matches = self.lookup(field, value)
+        return matches[0] if matches else None
+
+    def first_body(self, field, value):
+        """Return the serialized response of the first match or ``None``."""
+        matches = self.entries(field, value)
+        return matches[0].body if matches else None
+
+    def search(self, value):
+        """Return the entries of jobs whose identifiers contain ``value``, best match first."""
+        return [self.jobs[key] for key in self.search_index.search(value)]
+
+
+EMPTY_SNAPSHOT = Snapshot({}, [], build_indexes({}), diffable=False)
+
+
+class JobStore:
+    """Holds the current :class:`Snapshot` of the job data.
+
+    ``row_formatter`` turns a raw API record into the row a service returns
+    (e.g. the DSR report columns) and ``frame_builder`` turns the record list
+    into a DataFrame for services that filter with pandas. ``serializer``
+    turns a formatted row into the response bytes a lookup returns, so they
+    are encoded once per job change instead of per request. ``partitioner``
+    splits the snapshot (its DataFrame, whose rows follow ``order``) into the
+    snapshot's ``partitions`` so per-key views are computed once per refresh
+    rather than per request.
+
+    With ``incremental`` (the default) each new snapshot is diffed against
+    the current one by job key and ``updatedAt``/``__v``: unchanged jobs keep
+    their formatted and container rows, only added, changed and removed jobs
+    are reindexed, and the DataFrame is reused when nothing changed.
+
+    With ``snapshot_path`` the records of each snapshot can be persisted to
+    an Arrow file (:meth:`persist`) and restored from it on startup
+    (:meth:`restore`).
+    """
+
+    def __init__(self, row_formatter=None, frame_builder=None, incremental=True, snapshot_path=None,
+                 partitioner=None, serializer=None):
+        self.row_formatter = row_formatter
+        self.serializer = serializer
+        self.frame_builder = frame_builder
+        self.partitioner = partitioner
+        self.incremental = incremental
+        self.snapshot_path = snapshot_path
+        self._snapshot = EMPTY_SNAPSHOT
+
+    @property
+    def current(self):
+        """The latest published snapshot; read it once per request."""
+        return self._snapshot
+
+    @property
+    def is_loaded(self):
+        return self._snapshot is not EMPTY_SNAPSHOT
+
+    def build(self, payload, diffable=True):
+        """Build a new snapshot from ``payload`` without publishing it.
+
+        Safe to run in a worker thread while requests read the current one.
+        A record the formatter or serializer fails on is logged and left out.
+        Pass ``diffable=False`` for payloads that are not full API records
+        (e.g. rows read back from Excel) so the next refresh rebuilds fully.
+        """
+        previous = self._snapshot
+        if not (self.incremental and previous.diffable):
+            previous = EMPTY_SNAPSHOT
+        formatter = self.row_formatter
+        jobs, order = {}, []
+        added, changed = [], []
+        for record in extract_records(payload):
+            key = job_key(record)
+            old = previous.jobs.get(key)
+            if old is not None and old.is_current(record):
+                entry = old
+            else:
+                try:
+                    row = formatter(record) if formatter else record
+                    body = self.serializer(row) if self.serializer else None
+                except Exception as e:
+                    logger.error(f"Error formatting job {key}, skipping it: {e}")
+                    continue
+                entry = JobEntry(record, row, revision(record), explode_containers(record, key), body)
+            if key in jobs:
+                logger.warning(f"Duplicate job {key} in payload, keeping the last record")
+            else:
+                order.append(key)
+            jobs[key] = entry
+            if entry is not old:
+                (added if old is None else changed).append(key)
+        removed = [key for key in previous.jobs if key not in jobs]
+        changes = {"added": added, "changed": changed, "removed": removed}
+
+        # Postings list jobs in snapshot order, so an incremental update is
+        # only valid while the jobs carried over keep their relative order.
+        if previous is EMPTY_SNAPSHOT or ([key for key in order if key in previous.jobs]
+                                          != [key for key in previous.order if key in jobs]):
+            indexes = build_indexes(jobs)
+        else:
+            indexes = update_indexes(previous.indexes, previous.jobs, jobs, added + changed + removed, order)
+
+        unchanged = not any(changes.values()) and order == previous.order
+        snapshot = Snapshot(jobs, order, indexes, changes=changes, diffable=diffable,
+                            search_index=previous.search_index if unchanged else None)
+        if self.frame_builder:
+            if unchanged and previous.frame is not None:
+                snapshot.frame, snapshot.partitions = previous.frame, previous.partitions
+            else:
+                snapshot.frame = self.frame_builder(snapshot.records)
+                if self.partitioner:
+                    snapshot.partitions = self.partitioner(snapshot)
+        return snapshot
+
+    def publish(self, snapshot):
+        """Make ``snapshot`` current with a single atomic reference swap."""
+        self._snapshot = snapshot
+        counts = ", ".join(f"{len(keys)} {kind}" for kind, keys in snapshot.changes.items())
+        logger.info(f"Published job snapshot v{snapshot.version} ({len(snapshot)} jobs; {counts})")
+        return snapshot
+
+    def load(self, payload, diffable=True):
+        """Build and publish a snapshot in one step."""
+        return self.publish(self.build(payload, diffable))
+
+    def persist(self, snapshot):
+        """Write the records of ``snapshot`` to ``snapshot_path``; errors are logged."""
+        if not self.snapshot_path:
+            return
+        from shared import snapshot_file  # pyarrow is only needed once a snapshot is saved or loaded
+        try:
+            snapshot_file.write_records(snapshot.records, self.snapshot_path)
+            logger.info(f"Saved job snapshot v{snapshot.version} to {self.snapshot_path}")
+        except Exception as e:
+            logger.error(f"Error saving job snapshot {self.snapshot_path}: {e}")
+
+    def restore(self):
+        """Load and publish the snapshot saved at ``snapshot_path``, if any.
+
+        Returns the published snapshot, or ``None`` when there is nothing to
+        restore or the file cannot be read or built into a snapshot.
+        """
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        from shared import snapshot_file
+        try:
+            return self.load(snapshot_file.read_records(self.snapshot_path))
+        except Exception as e:
+            logger.error(f"Error loading job snapshot {self.snapshot_path}: {e}")
+            return None
+
+    def lookup(self, field, value):
+        return self.current.lookup(field, value)
+
+    def first(self, field, value):
+        return self.current.first(field, value)
+
+    def first_body(self, field, value):
+        return self.current.first_body(field, value)
+
+    def get_container(self, container_number):
+        return self.first(CONTAINER_FIELD, container_number)
+
+    def get_job(self, job_number):
+        return self.first("job_no", job_number)
+
+    def find_containers(self, container_number):
+        return self.current.find_containers(container_number)
+
+    def search(self, value):
+        """Return every row with an identifier containing ``value``, best match first."""
+        return [entry.row for entry in self.current.search(value)]
@@ -0,0 +1,45 @@
+"""JSON responses from bytes serialized ahead of time.
+
+Job data is serialized with orjson once per refresh, when a job is added or
+changed, and endpoints return the cached bytes. :class:`FastJSONResponse`
+sends ``bytes`` content as-is and encodes anything else with orjson, so hot
+endpoints skip FastAPI's ``jsonable_encoder`` pass entirely.
+"""
+import orjson
+from fastapi.responses import Response
+
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(value):
+    """Serialize ``value`` to JSON bytes; NaN and infinity become ``null``."""
+    return orjson.dumps(value, default=str, option=OPTIONS)
+
+
+def array(items):
+    """Join already serialized JSON values into a JSON array."""
+    return b"[" + b",".join(items) + b"]"
+
+
+def mapping(items):
+    """Build a JSON object from ``(key, serialized value)`` pairs; ``None`` values become ``null``."""
+    return b"{" + b",".join(dumps(str(key)) + b":" + (b"null" if value is None else value)
+                            for key, value in items) + b"}"
+
+
+def envelope(payload, **raw):
+    """Serialize the ``payload`` dict plus ``raw`` fields that are already JSON bytes."""
+    body = dumps(payload)
+    fields = [dumps(name) + b":" + value for name, value in raw.items()]
+    if not fields:
+        return body
+    return body[:-1] + (b"," if payload else b"") + b",".join(fields) + b"}"
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
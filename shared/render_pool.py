@@ -0,0 +1,59 @@
+"""Worker pool for CPU-bound report rendering.
+
+Building and saving an openpyxl workbook for the full Pending report takes
+seconds. Running it on the event loop stalls every lookup request, so the
+refresh loops hand it to this pool and await the result instead.
+
+Configured through environment variables:
+
+* ``EXIM_RENDER_EXECUTOR`` - ``thread`` (default) or ``process``. A process
+  pool sidesteps the GIL; the render function must then be a picklable
+  module-level function.
+* ``EXIM_RENDER_WORKERS`` - pool size (default 2).
+* ``EXIM_MAX_CONCURRENT_RENDERS`` - renders allowed in flight at once
+  (default 1); further renders wait their turn.
+"""
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+RENDER_EXECUTOR = os.environ.get("EXIM_RENDER_EXECUTOR", "thread")
+RENDER_WORKERS = int(os.environ.get("EXIM_RENDER_WORKERS", "2"))
+MAX_CONCURRENT_RENDERS = int(os.environ.get("EXIM_MAX_CONCURRENT_RENDERS", "1"))
+
+_executor = None
+_semaphore = None
+
+
+def get_executor():
+    """Return the process-wide render executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        if RENDER_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=RENDER_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+        logger.info(f"Started {RENDER_EXECUTOR} render pool with {RENDER_WORKERS} workers")
+    return _executor
+
+
+async def render(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` in the render pool and await its result."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENT_RENDERS)
+    async with _semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown():
+    """Stop the pool; call from the app's shutdown hook."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
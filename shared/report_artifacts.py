@@ -0,0 +1,133 @@
+"""Rendered reports stored under a content hash of their input.
+
+Each report file is named after the SHA-256 of the rows it was rendered
+from, so a refresh that produces the same rows finds the file already on
+disk and skips the render. The newest artifact is the one served; its hash
+doubles as the HTTP ``ETag``, which lets :func:`file_response` answer
+repeat downloads of an unchanged report with ``304 Not Modified``.
+
+The directory is shared by every worker process: only the refresh leader
+renders, and followers serve whatever it last stored.
+"""
+import hashlib
+import logging
+import os
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi.responses import FileResponse, Response
+
+from shared.json_response import dumps
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(*parts):
+    """SHA-256 hex digest of ``parts`` serialized as JSON."""
+    return hashlib.sha256(dumps(parts)).hexdigest()
+
+
+# Name of the pointer file holding the key of the current artifact.
+CURRENT_FILE = ".current"
+
+
+class ReportArtifacts:
+    """A directory of rendered reports, ``<content key><suffix>``, keeping the newest ``keep``."""
+
+    def __init__(self, directory, suffix=".xlsx", keep=3):
+        self.directory = directory
+        self.suffix = suffix
+        self.keep = keep
+        self.current_file = os.path.join(directory, CURRENT_FILE)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def temp_path(self, key):
+        """Where to render ``key`` before :meth:`store` moves it into place."""
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f".{key}.{os.getpid()}.tmp{self.suffix}")
+
+    def reuse(self, key):
+        """Make the stored artifact for ``key`` the current one; False if there is none."""
+        if not os.path.exists(self.path(key)):
+            return False
+        self._set_current(key)
+        return True
+
+    def store(self, key, rendered_path):
+        """Atomically move a rendered file into place as the current artifact for ``key``."""
+        path = self.path(key)
+        os.replace(rendered_path, path)
+        self._set_current(key)
+        self.prune()
+        return path
+
+    def _set_current(self, key):
+        tmp_path = f"{self.current_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(key)
+        os.replace(tmp_path, self.current_file)
+
+    def _current_key(self):
+        try:
+            with open(self.current_file) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _artifacts(self):
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.name.endswith(self.suffix) and not entry.name.startswith(".")]
+        except FileNotFoundError:
+            return []
+        return sorted(entries, key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+
+    def current(self):
+        """``(key, path)`` of the current artifact, else of the newest one, or ``None``."""
+        key = self._current_key()
+        if key is not None and os.path.exists(self.path(key)):
+            return key, self.path(key)
+        artifacts = self._artifacts()
+        if not artifacts:
+            return None
+        return artifacts[0].name[:-len(self.suffix)], artifacts[0].path
+
+    def prune(self):
+        """Remove all but the newest ``keep`` artifacts, never the current one."""
+        current = self.path(self._current_key() or "")
+        for entry in self._artifacts()[self.keep:]:
+            if entry.path == current:
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                logger.warning(f"Could not remove old report {entry.path}: {e}")
+
+
+def not_modified(request, etag, mtime):
+    """True if the request's validators show the client already has this version."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def file_response(request, key, path, filename, media_type):
+    """Serve the artifact at ``path``, or ``304`` if the client's copy is current."""
+    mtime = os.stat(path).st_mtime
+    headers = {
+        "ETag": f'"{key}"',
+        "Last-Modified": formatdate(mtime, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if not_modified(request, headers["ETag"], mtime):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path=path, filename=filename, media_type=media_type, headers=headers)
@@ -0,0 +1,87 @@
+"""Bounded result cache for the lookup endpoints.
+
+Entries are keyed by the normalized lookup key and tagged with the version
+of the job snapshot they were computed from. A refresh therefore needs no
+global clear: an entry from an older snapshot is treated as a miss and
+replaced the next time it is read. Found and not-found results expire
+after separate TTLs, and exceptions are never cached.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from shared.job_store import normalize_key
+
+
+class ResultCache:
+    """LRU cache with per-entry TTL and snapshot versioning.
+
+    ``get_or_compute(key, version, compute)`` returns the cached value for
+    ``key`` if it was computed for ``version`` and has not expired, and
+    otherwise calls ``compute(normalized_key)`` and caches its result.
+    Results for which ``is_negative`` is true use ``negative_ttl``.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, negative_ttl=30.0, key_func=normalize_key,
+                 is_negative=lambda value: value is None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.key_func = key_func
+        self.is_negative = is_negative
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.stale = 0
+
+    def _cached(self, key, version, now):
+        """Return ``(True, value)`` for a live entry; drops a stale or expired one. Call with the lock held."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        entry_version, expires_at, value = entry
+        if entry_version == version and expires_at > now:
+            self._entries.move_to_end(key)
+            return True, value
+        del self._entries[key]
+        if entry_version != version:
+            self.stale += 1
+        else:
+            self.expirations += 1
+        return False, None
+
+    def get_or_compute(self, key, version, compute):
+        key = self.key_func(key)
+        with self._lock:
+            found, value = self._cached(key, version, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = compute(key)
+        ttl = self.negative_ttl if self.is_negative(value) else self.ttl
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters since startup plus the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stale": self.stale,
+            }
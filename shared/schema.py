@@ -0,0 +1,115 @@
+"""Canonical schema of a job record from the Pending report.
+
+Every service selects and types the report columns through this module
+instead of keeping its own column list. Frames built by :func:`to_frame`
+hold real ``datetime64`` dates, float amounts and categorical codes for the
+low-cardinality text fields, so they are smaller than all-object frames and
+can be filtered with vectorized comparisons. The typed values are for
+sorting and filtering only: text that is not a date becomes ``NaT``, so
+responses serve the source records rather than rendering the frame back.
+"""
+import pandas as pd
+
+JOB_COLUMNS = [
+    'job_no', 'job_date', 'year', 'priorityJob', 'custom_house', 'importer',
+    'supplier_exporter', 'invoice_number', 'invoice_date', 'assbl_value', 'awb_bl_no',
+    'awb_bl_date', 'cif_amount', 'no_of_container', 'container_nos', 'cth_documents',
+    'description', 'type_of_b_e', 'gross_weight', 'loading_port', 'origin_country',
+    'port_of_reporting', 'shipping_line_airline', 'consignment_type', 'do_copies',
+    'cth_no', 'total_duty', 'voyage_no', 'detailed_status', 'vessel_berthing',
+    'vessel_flight', 'assessment_date', 'be_date', 'be_no', 'completed_operation_date',
+    'inv_currency', 'job_owner', 'total_inv_value', 'status', 'shipping_line_attachment',
+    'shipping_line_insurance', 'shipping_line_invoice_imgs', 'submissionQueries',
+    'unit_1', 'utr', 'verified_checklist_upload', '__v', 'bill_document_sent_to_accounts',
+    'containers_arrived_on_same_date', 'delivery_date', 'discharge_date', 'doPlanning',
+    'do_completed', 'do_planning_date', 'do_revalidation', 'do_revalidation_date',
+    'do_revalidation_upto_job_level', 'document_received_date', 'documentation_completed_date_time',
+    'duty_paid_date', 'esanchit_completed_date_time', 'examinationPlanning', 'examination_planning_date',
+    'free_time', 'gateway_igm_date', 'nfmims_date', 'nfmims_reg_no', 'obl_telex_bl',
+    'out_of_charge', 'pims_date', 'pims_reg_no', 'remarks', 'sims_date', 'sims_reg_no',
+    'submission_completed_date_time', 'type_of_Do', 'bill_date', 'bill_no', 'gateway_igm',
+    'hss_name', 'igm_date', 'igm_no', 'no_of_pkgs', 'toi', 'unit', 'unit_price',
+    'rail_out_date', 'do_validity_upto_job_level', 'do_processed', 'do_processed_date',
+    'do_validity', 'other_invoices', 'other_invoices_date', 'payment_made', 'payment_made_date',
+    'security_deposit', 'shipping_line_invoice', 'shipping_line_invoice_date', 'concor_gate_pass_date',
+    'concor_gate_pass_validate_up_to', 'examination_date', 'pcv_date', 'fta_Benefit_date_time',
+    'createdAt', 'updatedAt', 'custodian_gate_pass', 'do_documents', 'do_queries',
+    'documentationQueries', 'documents', 'eSachitQueries', 'exrate', 'gate_pass_copies',
+    'icd_cfs_invoice_img', 'importerURL', 'importer_address', 'is_free_time_updated',
+    'job_sticker_upload', 'ooc_copies', 'other_invoices_img', 'processed_be_attachment',
+]
+
+# Calendar dates, rendered back as YYYY-MM-DD.
+DATE_COLUMNS = [
+    'job_date', 'invoice_date', 'awb_bl_date', 'vessel_berthing', 'assessment_date', 'be_date',
+    'delivery_date', 'discharge_date', 'duty_paid_date', 'gateway_igm_date', 'nfmims_date',
+    'out_of_charge', 'pims_date', 'sims_date', 'bill_date', 'igm_date', 'do_validity_upto_job_level',
+    'do_validity', 'concor_gate_pass_date', 'concor_gate_pass_validate_up_to', 'examination_date',
+    'pcv_date', 'do_processed_date', 'other_invoices_date', 'payment_made_date',
+    'shipping_line_invoice_date',
+]
+# Timestamps with a time of day, rendered back as ISO 8601.
+DATETIME_COLUMNS = [
+    'completed_operation_date', 'do_completed', 'do_planning_date', 'do_revalidation_date',
+    'document_received_date', 'documentation_completed_date_time', 'esanchit_completed_date_time',
+    'examination_planning_date', 'submission_completed_date_time', 'rail_out_date',
+    'fta_Benefit_date_time', 'createdAt', 'updatedAt',
+]
+# The DO/payment dates are entered as dd/mm/yyyy; everything else is ISO.
+DATE_FORMATS = {
+    'do_processed_date': '%d/%m/%Y',
+    'other_invoices_date': '%d/%m/%Y',
+    'payment_made_date': '%d/%m/%Y',
+    'shipping_line_invoice_date': '%d/%m/%Y',
+}
+FLOAT_COLUMNS = ['cif_amount', 'assbl_value', 'total_duty', 'exrate']
+CATEGORY_COLUMNS = [
+    'custom_house', 'status', 'detailed_status', 'inv_currency', 'shipping_line_airline', 'importer',
+]
+# Identifiers that look numeric but must keep their leading zeros.
+STRING_COLUMNS = ['job_no', 'be_no', 'invoice_number', 'cth_no', 'igm_no', 'gateway_igm', 'awb_bl_no']
+
+
+def parse_dates(series, fmt='ISO8601'):
+    """Parse a column of date strings into naive ``datetime64``.
+
+    Blank and invalid values become ``NaT``. Values the column format does
+    not match are retried with per-value inference, which only touches the
+    few irregular entries.
+    """
+    values = series.where(series.notna() & (series.astype(str).str.strip() != ''))
+    parsed = pd.to_datetime(values, format=fmt, errors='coerce', utc=True)
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], format='mixed', errors='coerce', utc=True)
+    return parsed.dt.tz_localize(None)
+
+
+def apply_schema(df):
+    """Select the canonical columns of ``df`` and convert them to their dtypes."""
+    df = df[[col for col in JOB_COLUMNS if col in df.columns]].copy()
+    for col in DATE_COLUMNS + DATETIME_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_dates(df[col], DATE_FORMATS.get(col, 'ISO8601'))
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].where(df[col].notna(), None).astype('category')
+    for col in STRING_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str)).astype('string')
+    return df
+
+
+def to_frame(records):
+    """Build a typed job frame from API records."""
+    return apply_schema(pd.DataFrame(records))
+
+
+def select_columns(records):
+    """Build an untyped frame with the canonical columns, as the Excel exports write it."""
+    df = pd.DataFrame(records)
+    return df[[col for col in JOB_COLUMNS if col in df.columns]]
+
@@ -0,0 +1,33 @@
+"""Single-flight coalescing of concurrent identical calls.
+
+While a call for a key is in flight, later callers with the same key wait
+for it and share its result (or exception) instead of starting their own.
+Used so that a manual refresh and the refresh timer never fetch and rebuild
+at the same time.
+"""
+import asyncio
+
+
+class SingleFlight:
+    """Coalesces concurrent awaits of the same key into one running task."""
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def in_flight(self, key):
+        return key in self._calls
+
+    async def do(self, key, func, *args, **kwargs):
+        """Await ``func(*args, **kwargs)``, or the call already running for ``key``."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the call the others are waiting on.
+        return await asyncio.shield(task)
@@ -0,0 +1,96 @@
+"""Binary on-disk copy of the job snapshot.
+
+The refresh loop persists the records of each new snapshot as an Arrow IPC
+file so a restarting service can serve lookups straight away instead of
+parsing an Excel report. Arrow files are read through a memory map, so
+loading them costs little more than the pages actually touched.
+
+Scalar fields are stored as native Arrow columns. Fields that hold nested
+lists/dicts (``container_nos``, the document lists, ...) or mixed value
+types are stored as JSON text and listed in the file's schema metadata.
+Arrow columns are dense, so for a field that some records lack a boolean
+presence column is stored alongside it; the field is left out of those
+records again on load, and records round-trip exactly.
+"""
+import json
+import logging
+import os
+
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+JSON_COLUMNS_KEY = b"json_columns"
+PRESENCE_COLUMNS_KEY = b"presence_columns"
+PRESENCE_PREFIX = "__present__"
+
+
+def _column(values):
+    """Return ``(array, is_json)`` for one field's values."""
+    if not any(isinstance(value, (list, dict)) for value in values):
+        try:
+            return pa.array(values), False
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            pass
+    return pa.array([None if value is None else json.dumps(value) for value in values], pa.string()), True
+
+
+def records_to_table(records):
+    """Convert job records to an Arrow table, one column per field."""
+    fields = list(dict.fromkeys(field for record in records for field in record))
+    names, arrays, json_columns, presence_columns = [], [], [], {}
+    for field in fields:
+        array, is_json = _column([record.get(field) for record in records])
+        names.append(field)
+        arrays.append(array)
+        if is_json:
+            json_columns.append(field)
+        present = [field in record for record in records]
+        if not all(present):
+            presence_columns[field] = PRESENCE_PREFIX + field
+            names.append(presence_columns[field])
+            arrays.append(pa.array(present, pa.bool_()))
+    metadata = {
+        JSON_COLUMNS_KEY: json.dumps(json_columns).encode(),
+        PRESENCE_COLUMNS_KEY: json.dumps(presence_columns).encode(),
+    }
+    return pa.Table.from_arrays(arrays, names=names, metadata=metadata)
+
+
+def table_to_records(table):
+    """Convert a table written by :func:`records_to_table` back to records."""
+    metadata = table.schema.metadata or {}
+    json_columns = json.loads(metadata.get(JSON_COLUMNS_KEY, b"[]"))
+    presence_columns = json.loads(metadata.get(PRESENCE_COLUMNS_KEY, b"{}"))
+    masks = set(presence_columns.values())
+    names = [name for name in table.column_names if name not in masks]
+    columns = {name: table.column(name).to_pylist() for name in names}
+    for name in json_columns:
+        columns[name] = [None if value is None else json.loads(value) for value in columns[name]]
+    records = [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
+    for field, mask in presence_columns.items():
+        for record, present in zip(records, table.column(mask).to_pylist()):
+            if not present:
+                del record[field]
+    return records
+
+
+def write_records(records, path):
+    """Write ``records`` to ``path``, replacing any previous file atomically."""
+    table = records_to_table(records)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_table(path):
+    """Memory-map the Arrow file at ``path`` and return its table."""
+    # The table's buffers point into the map and keep it open while in use.
+    return pa.ipc.open_file(pa.memory_map(os.fspath(path), "r")).read_all()
+
+
+def read_records(path):
+    """Load the job records stored at ``path``."""
+    return table_to_records(read_table(path))
@@ -0,0 +1,66 @@
+"""Shared async client for the upstream EXIM report API.
+
+One ``httpx.AsyncClient`` per process keeps a pooled keep-alive connection to
+the report server, so refresh loops await the download instead of blocking
+the event loop, and transient failures are retried with backoff.
+"""
+import asyncio
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+API_URL = "http://43.205.59.159:9000/api/download-report/24-25/Pending"
+
+# The Pending report is large; allow a long read but fail fast on connect.
+TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+# Keep the pooled connection alive across the 300 s refresh interval.
+LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=330)
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 2.0
+
+_client = None
+
+
+def get_client():
+    """Return the process-wide client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS)
+    return _client
+
+
+async def close_client():
+    """Close the shared client; call from the app's shutdown hook."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def _is_retryable(error):
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, httpx.TransportError)
+
+
+async def fetch_json(url=API_URL, retries=MAX_RETRIES):
+    """GET ``url`` and return the decoded JSON body.
+
+    Timeouts, connection errors, 429 and 5xx responses are retried up to
+    ``retries`` times with exponential backoff; the last error is re-raised
+    as ``httpx.HTTPError``.
+    """
+    client = get_client()
+    for attempt in range(retries + 1):
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            delay = BACKOFF_SECONDS * 2 ** attempt
+            logger.warning(f"Upstream request failed ({e!r}), retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
@@ -0,0 +1,110 @@
+"""Leader/follower refresh for running a service with several workers.
+
+With ``EXIM_WORKERS`` > 1 a service is served by that many uvicorn worker
+processes. Only one of them, the leader, runs the refresh loop: it holds an
+exclusive lock next to the job store's snapshot file, fetches the upstream
+report and persists every new snapshot. The other workers never call the
+upstream API; they watch the snapshot file and memory-map each new version
+the leader writes. If the leader exits, or its refresh loop fails or
+returns, its lock is released and the next worker to poll takes over.
+
+Each service needs its own snapshot path: the lock is taken next to it, so
+services sharing a working directory must not share a snapshot file.
+
+With a single worker the process takes the lock immediately and behaves as
+before.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+from pathlib import Path
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("EXIM_WORKERS", "1"))
+FOLLOW_INTERVAL = float(os.getenv("EXIM_FOLLOW_INTERVAL", "5"))
+
+_leader_lock = None
+
+
+def is_leader():
+    return _leader_lock is not None
+
+
+def try_lead(snapshot_path):
+    """Take the leader lock for ``snapshot_path`` if no other process holds it."""
+    global _leader_lock
+    if _leader_lock is None:
+        lock = open(f"{snapshot_path}.lock", "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        _leader_lock = lock
+        logger.info(f"Worker {os.getpid()} is the refresh leader")
+    return True
+
+
+def release():
+    """Give up the leader lock so another worker can take over."""
+    global _leader_lock
+    if _leader_lock is not None:
+        _leader_lock.close()  # closing the file drops the flock
+        _leader_lock = None
+        logger.info(f"Worker {os.getpid()} released the refresh leader lock")
+
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+async def run(job_store, refresh_loop, interval=FOLLOW_INTERVAL):
+    """Run ``refresh_loop()`` if this worker leads, otherwise follow the snapshot file.
+
+    Start it as a background task from the app's startup hook: the last
+    persisted snapshot is loaded first, off the event loop, so the app
+    serves requests (and reports not ready) while it loads. ``job_store``
+    needs a ``snapshot_path``; the leader's loop is expected to
+    :meth:`~shared.job_store.JobStore.persist` each changed snapshot. If
+    the loop raises or returns, the lock is released and this worker goes
+    back to following until it can lead again.
+    """
+    path = job_store.snapshot_path
+    seen = _file_version(path)
+    if not job_store.is_loaded:
+        await asyncio.to_thread(job_store.restore)
+    while True:
+        while not try_lead(path):
+            version = _file_version(path)
+            if version is not None and version != seen:
+                if await asyncio.to_thread(job_store.restore) is not None:
+                    seen = version
+            await asyncio.sleep(interval)
+        try:
+            await refresh_loop()
+            logger.error("Refresh loop returned")
+        except Exception as e:
+            logger.error(f"Refresh loop failed: {e}")
+        finally:
+            release()
+        # Let a follower take over before competing for the lock again.
+        seen = _file_version(path)
+        await asyncio.sleep(interval)
+
+
+def serve(app, module_file, host, port):
+    """``uvicorn.run`` the service, with ``WORKERS`` processes when configured."""
+    if WORKERS > 1:
+        module = Path(module_file)
+        uvicorn.run(f"{module.stem}:app", host=host, port=port, workers=WORKERS,
+                    app_dir=str(module.resolve().parent))
+    else:
+        uvicorn.run(app, host=host, port=port)
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from openpyxl import load_workbook
+from openpyxl.styles import NamedStyle
+
+from shared.excel_export import StreamingReport
+
+
+def test_styled_rows_keep_every_value_and_its_number_format(tmp_path):
+    report = StreamingReport(styles=[NamedStyle(name="data")])
+    rows = [["a", datetime(2025, 2, 15), 1.5], ["b", None, 7]]
+    report.append_rows(rows, "data")
+    path = report.save(str(tmp_path / "report.xlsx"))
+
+    sheet = load_workbook(path).active
+    cells = [[cell for cell in row] for row in sheet.iter_rows()]
+
+    assert [[cell.value for cell in row] for row in cells] == rows
+    assert cells[0][1].is_date
+    assert not cells[0][2].is_date and not cells[1][2].is_date
+    assert {cell.style for row in cells for cell in row} == {"data"}
@@ -0,0 +1,46 @@
+import json
+
+import Authentification
+from shared import schema
+from shared.job_store import JobStore, job_key
+
+RECORDS = [
+    {"job_no": "00001", "year": "24-25", "importer": "ACME", "job_date": "2024-11-13",
+     "do_completed": "Yes", "vessel_berthing": "Invalid Date", "invoice_date": "Various",
+     "assessment_date": "12025-06-26", "payment_made_date": "15/01/2025",
+     "updatedAt": "2025-02-15T13:06:54.384Z", "cif_amount": "12.5"},
+    {"job_no": "00002", "year": "24-25", "importer": "Acme ", "job_date": "2024-12-01",
+     "do_completed": "2025-01-02T10:00:00.000Z", "container_nos": [{"container_number": "C1"}]},
+]
+
+
+def build_store():
+    store = JobStore(frame_builder=schema.to_frame, partitioner=Authentification.partition_by_importer)
+    store.load(RECORDS)
+    return store
+
+
+def test_filter_records_keep_the_values_the_api_sent():
+    view = build_store().current.partitions["acme"]
+
+    served = [json.loads(body) for body in view.bodies]
+
+    assert served == view.records
+    assert [record["job_no"] for record in served] == ["00002", "00001"]
+    for record in served:
+        source = next(r for r in RECORDS if r["job_no"] == record["job_no"])
+        assert record == {col: source.get(col) for col in view.source.columns}
+
+
+def test_search_finds_jobs_with_numeric_years_and_missing_job_numbers():
+    store = JobStore(frame_builder=schema.to_frame, partitioner=Authentification.partition_by_importer)
+    snapshot = store.load([
+        {"job_no": "00001", "year": 2024, "importer": "ACME", "job_date": "2024-11-13", "be_no": "BE123"},
+        {"job_no": "00002", "importer": "ACME", "job_date": "2024-11-13", "be_no": "BE124"},
+        {"year": 2025, "importer": "ACME", "job_date": "2024-11-13", "be_no": "BE125"},
+    ])
+    view = snapshot.partitions["acme"]
+
+    for entry in snapshot.search("BE12"):
+        assert view.records[view.index[job_key(entry.record)]] == {
+            col: entry.record.get(col) for col in view.source.columns}
@@ -0,0 +1,47 @@
+from shared.job_store import JobStore
+
+
+def job(job_no, updated_at, container="C1", be_no="BE1"):
+    return {"job_no": job_no, "year": "24-25", "be_no": be_no, "updatedAt": updated_at,
+            "container_nos": [{"container_number": container}]}
+
+
+def assert_same_as_full_build(store, records):
+    incremental = store.load(records)
+    full = JobStore().load(records)
+
+    assert incremental.changes != full.changes
+    assert incremental.indexes == full.indexes
+    for field, value in (("container_number", "C1"), ("be_no", "BE1")):
+        assert incremental.first(field, value) == full.first(field, value)
+    assert [e.record for e in incremental.search("C1")] == [e.record for e in full.search("C1")]
+
+
+def test_incremental_build_keeps_postings_in_snapshot_order():
+    store = JobStore()
+    store.load([job("1", "t1"), job("2", "t1")])
+
+    assert_same_as_full_build(store, [job("1", "t2"), job("2", "t1")])
+    assert store.first("container_number", "C1")["job_no"] == "1"
+
+
+def test_incremental_build_with_added_removed_and_moved_jobs():
+    store = JobStore()
+    store.load([job("1", "t1"), job("2", "t1"), job("3", "t1")])
+
+    assert_same_as_full_build(store, [job("0", "t1"), job("1", "t1"), job("3", "t2")])
+    assert_same_as_full_build(store, [job("3", "t2"), job("0", "t1"), job("1", "t1")])
+
+
+def test_build_skips_records_that_fail_to_format():
+    def format_row(record):
+        if record["job_no"] == "2":
+            raise TypeError("bad record")
+        return record["job_no"]
+
+    store = JobStore(row_formatter=format_row)
+    snapshot = store.load([job("1", "t1"), job("2", "t1", container="C2"), job("3", "t1", container="C3")])
+
+    assert snapshot.rows == ["1", "3"]
+    assert store.get_container("C2") is None
+    assert store.get_container("C3") == "3"
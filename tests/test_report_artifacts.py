@@ -0,0 +1,31 @@
+import os
+
+from shared.report_artifacts import ReportArtifacts
+
+
+def render(artifacts, key, content=b"report"):
+    path = artifacts.temp_path(key)
+    with open(path, "wb") as f:
+        f.write(content)
+    return artifacts.store(key, path)
+
+
+def test_reuse_serves_the_old_artifact_without_touching_its_mtime(tmp_path):
+    artifacts = ReportArtifacts(str(tmp_path))
+    old_path = render(artifacts, "old")
+    os.utime(old_path, (1_000_000, 1_000_000))
+    render(artifacts, "new")
+
+    assert artifacts.reuse("old")
+
+    assert artifacts.current() == ("old", old_path)
+    assert os.stat(old_path).st_mtime == 1_000_000
+
+
+def test_reuse_of_a_missing_artifact_keeps_the_current_one(tmp_path):
+    artifacts = ReportArtifacts(str(tmp_path))
+    path = render(artifacts, "first")
+
+    assert not artifacts.reuse("missing")
+    assert artifacts.current() == ("first", path)
+
@@ -0,0 +1,38 @@
+from shared import dsr_report, snapshot_file
+from shared.job_store import JobStore
+
+SPARSE_RECORDS = [
+    {"job_no": "00001", "year": "24-25", "importer": "ACME", "duty_paid_date": "2024-11-13",
+     "container_nos": [{"container_number": "MRKU2509388", "size": "40"}], "__v": 2},
+    {"job_no": "00002", "year": "24-25", "importer": None, "no_of_container": 3},
+    {"job_no": "00003", "year": "24-25", "container_nos": [], "cif_amount": "12.5"},
+]
+
+
+def test_sparse_records_round_trip(tmp_path):
+    path = tmp_path / "jobs.arrow"
+    snapshot_file.write_records(SPARSE_RECORDS, path)
+
+    assert snapshot_file.read_records(path) == SPARSE_RECORDS
+
+
+def test_restored_snapshot_formats_like_the_original(tmp_path):
+    path = str(tmp_path / "jobs.arrow")
+    original = JobStore(row_formatter=dsr_report.format_row, snapshot_path=path)
+    original.persist(original.load(SPARSE_RECORDS))
+
+    restored = JobStore(row_formatter=dsr_report.format_row, snapshot_path=path)
+
+    assert restored.restore() is not None
+    assert restored.current.rows == original.current.rows
+    assert not any("None" in str(value) for row in restored.current.rows[:1] for value in row)
+
+
+def test_restore_logs_and_returns_none_when_the_snapshot_cannot_be_read(tmp_path):
+    path = tmp_path / "jobs.arrow"
+    path.write_bytes(b"not an arrow file")
+
+    store = JobStore(row_formatter=dsr_report.format_row, snapshot_path=str(path))
+
+    assert store.restore() is None
+    assert not store.is_loaded